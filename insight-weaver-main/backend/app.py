@@ -1,7 +1,8 @@
-from flask import Flask
+from flask import Flask, g, request
 from flask_cors import CORS
 import os
 import logging
+import time
 
 # Try to load dotenv, but make it optional
 try:
@@ -17,8 +18,15 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+from services.upload_spool import SpoolingRequest, get_upload_limiter
+
 app = Flask(__name__)
 
+# Uploads larger than UPLOAD_MEMORY_THRESHOLD_KB are spooled to disk, and
+# request bodies beyond MAX_UPLOAD_MB are refused with 413
+app.request_class = SpoolingRequest
+app.config['MAX_CONTENT_LENGTH'] = get_upload_limiter().max_upload_bytes
+
 # Configure CORS to allow frontend access
 frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:5173')
 CORS(app, resources={
@@ -58,14 +66,67 @@ try:
 except ImportError as e:
     print(f"Warning: Transcript processing not available: {e}")
 
+# Import background job route
+try:
+    from routes.jobs import jobs_bp
+    app.register_blueprint(jobs_bp, url_prefix='/api')
+    print("Background jobs enabled")
+except ImportError as e:
+    print(f"Warning: Background jobs not available: {e}")
+
 # Register blueprints
 app.register_blueprint(analyze_bp, url_prefix='/api')
 app.register_blueprint(pdf_bp, url_prefix='/api')
 
+# Prometheus metrics
+from routes.metrics import metrics_bp
+from services.metrics import http_request_duration, set_endpoint
+app.register_blueprint(metrics_bp, url_prefix='/api')
+
+@app.errorhandler(413)
+def request_too_large(error):
+    return {'error': f'Request exceeds the {get_upload_limiter().max_upload_bytes // (1024 * 1024)} MB limit'}, 413
+
+@app.before_request
+def reject_oversized_request():
+    # Routes catch every exception while reading their body; refuse early instead
+    if request.content_length is not None and request.content_length > app.config['MAX_CONTENT_LENGTH']:
+        return request_too_large(None)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    set_endpoint(request.endpoint)
+
+@app.after_request
+def record_request_duration(response):
+    started = g.get('request_started')
+    if started is not None and request.endpoint:
+        endpoint, status = request.endpoint, str(response.status_code)
+
+        def observe():
+            http_request_duration.observe(time.perf_counter() - started, endpoint=endpoint, status=status)
+
+        if response.is_streamed:
+            # Streamed bodies (/analyze/stream, /analyze/batch) are generated after this hook
+            response.call_on_close(observe)
+        else:
+            observe()
+    return response
+
+# Preload the Ollama model in the background and keep it resident
+from services.model_keeper import get_model_keeper
+model_keeper = get_model_keeper()
+model_keeper.start()
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return {'status': 'ok', 'message': 'Flask backend is running'}, 200
+    return {
+        'status': 'ok',
+        'message': 'Flask backend is running',
+        'model': model_keeper.get_status()
+    }, 200
 
 if __name__ == '__main__':
     port = int(os.getenv('FLASK_PORT', 5000))
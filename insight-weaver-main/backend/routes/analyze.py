@@ -1,10 +1,61 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from services.json_stream import format_sse
+from services.llm_scheduler import LLMOverloadedError
 from services.llm_service import LLMService
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import contextvars
+import json
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 analyze_bp = Blueprint('analyze', __name__)
 llm_service = LLMService()
+batch_max_items = int(os.getenv('ANALYZE_BATCH_MAX_ITEMS', 500))
+# Two items per Ollama slot: while one generates, the next is already queued for the slot
+batch_workers = max(1, int(os.getenv('ANALYZE_BATCH_WORKERS', 2 * llm_service.scheduler.max_concurrency)))
+
+# llm: full Ollama analysis; fast: local keyphrase-based map without the LLM
+ANALYZE_MODES = ('llm', 'fast')
+
+def _read_analyze_request():
+    """Validate the analyze request body, returning (content, type, mode, error_response)"""
+    data = request.get_json()
+    
+    if not data:
+        return None, None, None, (jsonify({'error': 'No JSON data provided'}), 400)
+    
+    content = data.get('content')
+    content_type = data.get('type', 'text')
+    mode = data.get('mode', 'llm')
+    
+    if not content:
+        return None, None, None, (jsonify({'error': 'Content is required'}), 400)
+    
+    if not isinstance(content, str) or len(content.strip()) < 50:
+        return None, None, None, (jsonify({'error': 'Content must be at least 50 characters'}), 400)
+    
+    if mode not in ANALYZE_MODES:
+        return None, None, None, (jsonify({'error': f'mode must be one of: {", ".join(ANALYZE_MODES)}'}), 400)
+    
+    return content, content_type, mode, None
+
+def _run_analysis(content, content_type, mode='llm', adaptive=False):
+    """Analyze content with the requested mode; adaptive requests may be served by a cheaper tier under load"""
+    if mode == 'fast':
+        return llm_service.analyze_fast(content, content_type)
+    if adaptive:
+        return llm_service.analyze_adaptive(content, content_type)
+    return llm_service.analyze_content(content, content_type)
+
+def _overloaded_response(error: LLMOverloadedError):
+    """Build a 429/503 response with Retry-After for a rejected request"""
+    response = jsonify({
+        'error': str(error),
+        'retryAfter': error.retry_after
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, error.status_code
 
 @analyze_bp.route('/analyze', methods=['POST', 'OPTIONS'])
 def analyze():
@@ -14,29 +65,25 @@ def analyze():
         return '', 200
     
     try:
-        data = request.get_json()
+        content, content_type, mode, error_response = _read_analyze_request()
+        if error_response:
+            return error_response
         
-        if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
-        
-        content = data.get('content')
-        content_type = data.get('type', 'text')
-        
-        if not content:
-            return jsonify({'error': 'Content is required'}), 400
-        
-        if not isinstance(content, str) or len(content.strip()) < 50:
-            return jsonify({'error': 'Content must be at least 50 characters'}), 400
-        
-        logger.info(f'Analyzing content of type: {content_type}, length: {len(content)}')
+        logger.info(f'Analyzing content of type: {content_type}, length: {len(content)}, mode: {mode}')
         
         # Call LLM service for analysis
-        result = llm_service.analyze_content(content, content_type)
+        result = _run_analysis(content, content_type, mode, adaptive=True)
+        tier = result.get('analysisMeta', {}).get('tier', mode)
         
-        logger.info(f'Analysis complete. Topics found: {len(result.get("keyTopics", []))}')
+        logger.info(f'Analysis complete. Topics found: {len(result.get("keyTopics", []))}, tier: {tier}')
         
-        return jsonify(result), 200
+        response = jsonify(result)
+        response.headers['X-Analysis-Tier'] = tier
+        return response, 200
         
+    except LLMOverloadedError as e:
+        logger.warning(f'Analyze request rejected by admission control: {str(e)}')
+        return _overloaded_response(e)
     except Exception as e:
         logger.error(f'Error in analyze endpoint: {str(e)}', exc_info=True)
         error_message = str(e)
@@ -57,3 +104,131 @@ def analyze():
             'error': 'Failed to analyze content',
             'details': error_message
         }), 500
+
+@analyze_bp.route('/analyze/stream', methods=['POST', 'OPTIONS'])
+def analyze_stream():
+    """Analyze content and stream progress as Server-Sent Events"""
+    
+    if request.method == 'OPTIONS':
+        return '', 200
+    
+    content, content_type, mode, error_response = _read_analyze_request()
+    if error_response:
+        return error_response
+    
+    logger.info(f'Streaming analysis of type: {content_type}, length: {len(content)}, mode: {mode}')
+    
+    def generate():
+        try:
+            if mode == 'fast':
+                events = llm_service.replay_events(llm_service.analyze_fast(content, content_type))
+            else:
+                events = llm_service.stream_adaptive(content, content_type)
+            for event, payload in events:
+                if event == 'summary':
+                    yield format_sse('summary', {'summary': payload})
+                elif event == 'topicNode':
+                    yield format_sse('topicNode', {'node': payload})
+                else:
+                    logger.info(f'Streaming analysis complete. Topics found: {len(payload.get("keyTopics", []))}')
+                    yield format_sse('result', payload)
+        except LLMOverloadedError as e:
+            logger.warning(f'Streaming analysis rejected by admission control: {str(e)}')
+            yield format_sse('error', {'error': str(e), 'retryAfter': e.retry_after})
+        except Exception as e:
+            logger.error(f'Error in analyze stream: {str(e)}', exc_info=True)
+            yield format_sse('error', {'error': 'Failed to analyze content', 'details': str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+@analyze_bp.route('/analyze/batch', methods=['POST', 'OPTIONS'])
+def analyze_batch():
+    """Analyze a list of documents, streaming one NDJSON line per item as each finishes"""
+    
+    if request.method == 'OPTIONS':
+        return '', 200
+    
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({'error': 'No JSON data provided'}), 400
+    
+    items = data.get('items')
+    default_mode = data.get('mode', 'llm')
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'items must be a non-empty list'}), 400
+    
+    if default_mode not in ANALYZE_MODES:
+        return jsonify({'error': f'mode must be one of: {", ".join(ANALYZE_MODES)}'}), 400
+    
+    if len(items) > batch_max_items:
+        return jsonify({'error': f'A batch may contain at most {batch_max_items} items'}), 400
+    
+    logger.info(f'Batch analysis of {len(items)} items with {batch_workers} workers')
+    
+    def analyze_item(item):
+        if not isinstance(item, dict):
+            raise ValueError('Item must be an object with content and type')
+        content = item.get('content')
+        if not isinstance(content, str) or len(content.strip()) < 50:
+            raise ValueError('Content must be at least 50 characters')
+        mode = item.get('mode', default_mode)
+        if mode not in ANALYZE_MODES:
+            raise ValueError(f'mode must be one of: {", ".join(ANALYZE_MODES)}')
+        # Items wait for a slot like jobs do; the batch's worker count bounds what it queues
+        with llm_service.scheduler.request(background=True):
+            return _run_analysis(content, item.get('type', 'text'), mode)
+    
+    def generate():
+        succeeded = 0
+        executor = ThreadPoolExecutor(max_workers=min(batch_workers, len(items)))
+        try:
+            # Each item runs in a copy of the request's context, which labels its LLM metrics
+            futures = {executor.submit(contextvars.copy_context().run, analyze_item, item): index
+                       for index, item in enumerate(items)}
+            for future in as_completed(futures):
+                index = futures[future]
+                item = items[index]
+                line = {'index': index}
+                if isinstance(item, dict) and 'id' in item:
+                    line['id'] = item['id']
+                try:
+                    result = future.result()
+                    line.update({'status': 'ok', 'result': result})
+                    succeeded += 1
+                except LLMOverloadedError as e:
+                    line.update({'status': 'error', 'error': str(e), 'retryAfter': e.retry_after})
+                except Exception as e:
+                    logger.warning(f'Batch item {index} failed: {str(e)}')
+                    line.update({'status': 'error', 'error': str(e)})
+                yield json.dumps(line) + '\n'
+            
+            logger.info(f'Batch analysis complete: {succeeded}/{len(items)} succeeded')
+            yield json.dumps({
+                'done': True,
+                'total': len(items),
+                'succeeded': succeeded,
+                'failed': len(items) - succeeded
+            }) + '\n'
+        finally:
+            # Stop scheduling remaining items if the client goes away
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'X-Accel-Buffering': 'no'}
+    )
+
+@analyze_bp.route('/analyze/stats', methods=['GET'])
+def analyze_stats():
+    """Return analysis cache and pipeline statistics"""
+    return jsonify(llm_service.get_stats()), 200
@@ -0,0 +1,165 @@
+from flask import Blueprint, request, jsonify, send_file
+from services.job_service import get_job_service
+from services.llm_scheduler import LLMOverloadedError
+from services.llm_service import LLMService
+from services.pdf_service import PDFService
+from routes.analyze import ANALYZE_MODES
+from routes.transcript import build_transcript_summary
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+jobs_bp = Blueprint('jobs', __name__)
+job_service = get_job_service()
+llm_service = LLMService()
+pdf_service = PDFService()
+
+# Attempts of a job analysis while Ollama is unavailable (circuit breaker open)
+JOB_ANALYZE_ATTEMPTS = 5
+
+def analyze_in_background(content, content_type, context):
+    """
+    analyze_content for a job: wait for an LLM slot instead of being shed,
+    and back off while Ollama is unavailable.
+    """
+    for attempt in range(1, JOB_ANALYZE_ATTEMPTS + 1):
+        try:
+            with llm_service.scheduler.request(background=True):
+                return llm_service.analyze_content(content, content_type)
+        except LLMOverloadedError as e:
+            if attempt == JOB_ANALYZE_ATTEMPTS:
+                raise
+            context.set_progress(0.1, f'Waiting for the LLM (retry in {e.retry_after}s)')
+            time.sleep(min(e.retry_after, 60))
+
+def run_analyze_job(payload, context):
+    """Job handler for kind=analyze (same payload as /api/analyze)"""
+    content = payload.get('content')
+    content_type = payload.get('type', 'text')
+
+    if not isinstance(content, str) or len(content.strip()) < 50:
+        raise ValueError('Content must be at least 50 characters')
+
+    mode = payload.get('mode', 'llm')
+    if mode not in ANALYZE_MODES:
+        raise ValueError(f'mode must be one of: {", ".join(ANALYZE_MODES)}')
+
+    if mode == 'fast':
+        return llm_service.analyze_fast(content, content_type)
+
+    context.set_progress(0.1, 'Analyzing content')
+    return analyze_in_background(content, content_type, context)
+
+def run_transcript_job(payload, context):
+    """Job handler for kind=transcript (same payload as /api/process-transcript)"""
+    transcript_text = payload.get('transcript')
+    title = payload.get('title', 'Meeting Transcript')
+    duration = payload.get('duration', 0)
+    source = payload.get('source', 'manual')
+
+    if not isinstance(transcript_text, str) or len(transcript_text.strip()) < 50:
+        raise ValueError('Transcript must be at least 50 characters')
+
+    context.set_progress(0.1, 'Analyzing transcript')
+    analysis_result = analyze_in_background(transcript_text, source, context)
+
+    return {
+        'success': True,
+        'transcriptSummary': build_transcript_summary(analysis_result, transcript_text, title, duration, source),
+        'message': 'Transcript processed successfully'
+    }
+
+def run_pdf_job(payload, context):
+    """Job handler for kind=pdf (same payload as /api/generate-pdf)"""
+    if 'summary' not in payload and 'topicTree' not in payload:
+        raise ValueError('Missing required fields: summary or topicTree')
+
+    context.set_progress(0.1, 'Generating PDF')
+    pdf_buffer = pdf_service.generate_pdf(payload)
+    context.check_cancelled()
+
+    with open(os.path.join(context.files_dir, f'{context.job_id}.pdf'), 'wb') as f:
+        f.write(pdf_buffer.getvalue())
+
+    return {
+        'filename': 'learning_map_analysis.pdf',
+        'downloadUrl': f'/api/jobs/{context.job_id}/download'
+    }
+
+job_service.register('analyze', run_analyze_job)
+job_service.register('transcript', run_transcript_job)
+job_service.register('pdf', run_pdf_job)
+job_service.recover()
+
+@jobs_bp.route('/jobs', methods=['POST', 'OPTIONS'])
+def create_job():
+    """Submit a background job and return its id immediately"""
+
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    data = request.get_json()
+
+    if not data:
+        return jsonify({'error': 'No JSON data provided'}), 400
+
+    kind = data.get('kind')
+    payload = data.get('payload')
+
+    if kind not in job_service.kinds:
+        return jsonify({'error': f'Job kind must be one of: {", ".join(job_service.kinds)}'}), 400
+
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Job payload must be a JSON object'}), 400
+
+    if kind == 'analyze' and payload.get('mode', 'llm') not in ANALYZE_MODES:
+        return jsonify({'error': f'mode must be one of: {", ".join(ANALYZE_MODES)}'}), 400
+
+    job = job_service.submit(kind, payload)
+    logger.info(f'Job submitted: {job["id"]} ({kind})')
+
+    return jsonify(job), 202
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Return job status, progress and result"""
+    job = job_service.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 200
+
+@jobs_bp.route('/jobs/<job_id>/cancel', methods=['POST', 'OPTIONS'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    job = job_service.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    logger.info(f'Job cancellation requested: {job_id} (status: {job["status"]})')
+    return jsonify(job), 200
+
+@jobs_bp.route('/jobs/<job_id>/download', methods=['GET'])
+def download_job_file(job_id):
+    """Download the PDF produced by a completed pdf job"""
+    job = job_service.get_job(job_id)
+    if job is None or job['kind'] != 'pdf':
+        return jsonify({'error': 'Job not found'}), 404
+
+    if job['status'] != 'completed':
+        return jsonify({'error': f'Job is {job["status"]}'}), 409
+
+    pdf_path = os.path.join(job_service.files_dir, f'{job_id}.pdf')
+    if not os.path.exists(pdf_path):
+        return jsonify({'error': 'Job output is no longer available'}), 410
+
+    return send_file(
+        pdf_path,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=job['result'].get('filename', 'learning_map_analysis.pdf')
+    )
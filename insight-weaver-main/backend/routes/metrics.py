@@ -0,0 +1,78 @@
+from flask import Blueprint, Response
+from services import metrics
+from services.llm_service import LLMService
+from services.pdf_text_cache import get_pdf_text_cache
+
+metrics_bp = Blueprint('metrics', __name__)
+llm_service = LLMService()
+
+
+def _cache_samples():
+    if llm_service.cache is None:
+        return []
+    stats = llm_service.cache.get_stats()
+    return [
+        (('memory',), stats['memory_hits']),
+        (('disk',), stats['disk_hits']),
+    ]
+
+
+def _cache_miss_samples():
+    if llm_service.cache is None:
+        return []
+    return [((), llm_service.cache.get_stats()['misses'])]
+
+
+def _near_duplicate_hit_samples():
+    if llm_service.cache is None:
+        return []
+    return [((), llm_service.cache.get_stats()['near_duplicate_hits'])]
+
+
+def _pdf_cache_samples(field):
+    return lambda: [((), get_pdf_text_cache().get_stats()[field])]
+
+
+def _scheduler_samples(field):
+    return lambda: [((), llm_service.scheduler.get_stats()[field])]
+
+
+def _single_flight_samples(field):
+    return lambda: [((), llm_service.single_flight.get_stats()[field])]
+
+
+def _tier_samples():
+    return [((tier,), count) for tier, count in llm_service.load_shedder.get_stats()['tiers'].items()]
+
+
+def _backend_samples():
+    return [((backend['url'],), 0 if backend['ejected'] or not backend['healthy'] else 1)
+            for backend in llm_service.client.get_status()]
+
+
+def _warm_samples():
+    status = llm_service.keeper.get_status()
+    return [((url, status['name']), 1 if backend['warm'] else 0) for url, backend in status['backends'].items()]
+
+
+metrics.registry.collector('insightmap_analysis_cache_hits_total', 'Analysis cache hits by tier', 'counter', ['tier'], _cache_samples)
+metrics.registry.collector('insightmap_analysis_cache_misses_total', 'Analysis cache misses', 'counter', (), _cache_miss_samples)
+metrics.registry.collector('insightmap_analysis_near_duplicate_hits_total', 'Analyses served from the cached result of a near-duplicate input', 'counter', (), _near_duplicate_hit_samples)
+metrics.registry.collector('insightmap_pdf_text_cache_hits_total', 'PDF uploads served from the extracted text cache', 'counter', (), _pdf_cache_samples('hits'))
+metrics.registry.collector('insightmap_pdf_text_cache_misses_total', 'PDF uploads that had to be extracted', 'counter', (), _pdf_cache_samples('misses'))
+metrics.registry.collector('insightmap_llm_active_generations', 'Generations currently holding an LLM slot', 'gauge', (), _scheduler_samples('active'))
+metrics.registry.collector('insightmap_llm_queue_depth', 'Requests waiting for an LLM slot', 'gauge', (), _scheduler_samples('queue_depth'))
+metrics.registry.collector('insightmap_llm_rejected_queue_full_total', 'Requests rejected because the LLM queue was full', 'counter', (), _scheduler_samples('rejected_queue_full'))
+metrics.registry.collector('insightmap_llm_rejected_deadline_total', 'Requests rejected because they could not get an LLM slot in time', 'counter', (), _scheduler_samples('rejected_deadline'))
+metrics.registry.collector('insightmap_single_flight_coalesced_total', 'Analyses that waited on an identical in-flight analysis', 'counter', (), _single_flight_samples('coalesced'))
+metrics.registry.collector('insightmap_analysis_tier_total', 'Interactive analyses by the tier that served them', 'counter', ['tier'], _tier_samples)
+metrics.registry.collector('insightmap_ollama_circuit_open', 'Whether the Ollama circuit breaker is rejecting calls (1 open, 0.5 half-open, 0 closed)', 'gauge', (),
+                           lambda: [((), {'open': 1, 'half_open': 0.5}.get(llm_service.client.breaker.state, 0))])
+metrics.registry.collector('insightmap_ollama_backend_up', 'Whether an Ollama host is in rotation', 'gauge', ['url'], _backend_samples)
+metrics.registry.collector('insightmap_ollama_model_warm', 'Whether the model is loaded on an Ollama host', 'gauge', ['url', 'model'], _warm_samples)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Expose backend metrics in Prometheus text format"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
@@ -1,10 +1,12 @@
 from flask import Blueprint, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+from services.upload_spool import UploadRejectedError, get_upload_limiter
 import logging
 
 logger = logging.getLogger(__name__)
 
 try:
-    from services.pdf_extract_service import PDFExtractService
+    from services.pdf_extract_service import PDFDocumentNotFoundError, PDFExtractService
     pdf_service = PDFExtractService()
     PDF_EXTRACT_AVAILABLE = True
 except ImportError:
@@ -12,6 +14,87 @@ except ImportError:
     logger.warning("PDF extraction service not available. Install PyPDF2 for PDF upload support.")
 
 pdf_extract_bp = Blueprint('pdf_extract', __name__)
+upload_limiter = get_upload_limiter()
+
+def _max_chars(value):
+    """Parse the optional maxChars parameter"""
+    if value in (None, ''):
+        return None
+    try:
+        max_chars = int(value)
+    except (TypeError, ValueError):
+        max_chars = 0
+    if max_chars <= 0:
+        raise ValueError('maxChars must be a positive integer')
+    return max_chars
+
+def _extraction_response(result, whole_document):
+    """JSON response for an extraction result"""
+    text_content = result['content']
+    
+    # A page range may legitimately be short; the whole document may not
+    if whole_document and (not text_content or len(text_content.strip()) < 50):
+        return jsonify({'error': 'Could not extract sufficient text from PDF (minimum 50 characters required)'}), 400
+    
+    extraction = result['extraction']
+    logger.info(f'PDF text extracted successfully. Length: {len(text_content)} characters, '
+                f'pages: {len(result["pages"])}/{result["pageCount"]}, workers: {extraction["workers"]}, '
+                f'duration: {extraction["durationMs"]} ms')
+    
+    return jsonify({
+        'documentId': result['documentId'],
+        'pageCount': result['pageCount'],
+        'pages': result['pages'],
+        'truncated': result['truncated'],
+        'nextPage': result['nextPage'],
+        'content': text_content,
+        'length': len(text_content),
+        'extraction': extraction
+    }), 200
+
+def _extraction_error(e):
+    """Map an extraction failure to an error response"""
+    if isinstance(e, PDFDocumentNotFoundError):
+        return jsonify({'error': str(e)}), 404
+    
+    if isinstance(e, ValueError):
+        return jsonify({'error': str(e)}), 400
+    
+    logger.error(f'Error extracting PDF text: {str(e)}', exc_info=True)
+    error_message = str(e)
+    
+    if 'PDF' in error_message or 'pdf' in error_message:
+        return jsonify({
+            'error': 'Failed to read PDF file. Please ensure it is a valid PDF.',
+            'details': error_message
+        }), 400
+    
+    return jsonify({
+        'error': 'Failed to extract text from PDF',
+        'details': error_message
+    }), 500
+
+def _extract_uploaded_pdf():
+    """Validate the uploaded file and extract the requested pages"""
+    # Check if file is in request
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file provided'}), 400
+    
+    file = request.files['file']
+    
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+    
+    if not file.filename.endswith('.pdf'):
+        return jsonify({'error': 'File must be a PDF'}), 400
+    
+    pages = request.form.get('pages')
+    max_chars = _max_chars(request.form.get('maxChars'))
+    
+    logger.info(f'Extracting text from PDF: {file.filename}')
+    
+    result = pdf_service.extract_range(file, pages=pages, max_chars=max_chars)
+    return _extraction_response(result, whole_document=not pages and not max_chars)
 
 @pdf_extract_bp.route('/extract-pdf', methods=['POST', 'OPTIONS'])
 def extract_pdf():
@@ -24,44 +107,33 @@ def extract_pdf():
         return jsonify({'error': 'PDF extraction not available. Please install PyPDF2.'}), 503
     
     try:
-        # Check if file is in request
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
-        
-        file = request.files['file']
-        
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
-        
-        if not file.filename.endswith('.pdf'):
-            return jsonify({'error': 'File must be a PDF'}), 400
-        
-        logger.info(f'Extracting text from PDF: {file.filename}')
-        
-        # Extract text from PDF
-        text_content = pdf_service.extract_text(file)
-        
-        if not text_content or len(text_content.strip()) < 50:
-            return jsonify({'error': 'Could not extract sufficient text from PDF (minimum 50 characters required)'}), 400
-        
-        logger.info(f'PDF text extracted successfully. Length: {len(text_content)} characters')
-        
-        return jsonify({
-            'content': text_content,
-            'length': len(text_content)
-        }), 200
-        
+        # Reserve the upload's bytes before reading the body, so concurrent
+        # large uploads are refused instead of piling up
+        with upload_limiter.reserve(request.content_length):
+            return _extract_uploaded_pdf()
+    except UploadRejectedError as e:
+        logger.warning(f'PDF upload rejected: {str(e)}')
+        response = jsonify({'error': str(e)})
+        if e.retry_after:
+            response.headers['Retry-After'] = str(e.retry_after)
+        return response, e.status_code
+    except RequestEntityTooLarge:
+        # Body without a Content-Length that turned out too large
+        raise
     except Exception as e:
-        logger.error(f'Error extracting PDF text: {str(e)}', exc_info=True)
-        error_message = str(e)
-        
-        if 'PDF' in error_message or 'pdf' in error_message:
-            return jsonify({
-                'error': 'Failed to read PDF file. Please ensure it is a valid PDF.',
-                'details': error_message
-            }), 400
-        
-        return jsonify({
-            'error': 'Failed to extract text from PDF',
-            'details': error_message
-        }), 500
+        return _extraction_error(e)
+
+@pdf_extract_bp.route('/extract-pdf/<document_id>', methods=['GET'])
+def extract_pdf_pages(document_id):
+    """Extract further pages of a previously uploaded PDF by its documentId"""
+    
+    if not PDF_EXTRACT_AVAILABLE:
+        return jsonify({'error': 'PDF extraction not available. Please install PyPDF2.'}), 503
+    
+    try:
+        pages = request.args.get('pages')
+        max_chars = _max_chars(request.args.get('maxChars'))
+        result = pdf_service.extract_range(document_id=document_id, pages=pages, max_chars=max_chars)
+        return _extraction_response(result, whole_document=False)
+    except Exception as e:
+        return _extraction_error(e)
@@ -1,4 +1,5 @@
 from flask import Blueprint, request, jsonify
+from services.llm_scheduler import LLMOverloadedError
 from services.llm_service import LLMService
 import logging
 from datetime import datetime
@@ -8,6 +9,20 @@ logger = logging.getLogger(__name__)
 transcript_bp = Blueprint('transcript', __name__)
 llm_service = LLMService()
 
+def build_transcript_summary(analysis_result, transcript_text, title, duration, source):
+    """Create the transcript summary object returned to the frontend"""
+    return {
+        'id': str(uuid.uuid4()),
+        'title': title,
+        'date': datetime.now().isoformat(),
+        'duration': str(duration),
+        'summary': analysis_result.get('summary', ''),
+        'keyTopics': analysis_result.get('keyTopics', []),
+        'transcriptType': source,
+        'analysisResult': analysis_result,
+        'rawTranscript': transcript_text[:500],  # Store first 500 chars for preview
+    }
+
 @transcript_bp.route('/process-transcript', methods=['POST', 'OPTIONS'])
 def process_transcript():
     """Process voice transcript from Zoom/Google Meet"""
@@ -37,18 +52,7 @@ def process_transcript():
         # Analyze transcript using LLM service
         analysis_result = llm_service.analyze_content(transcript_text, source)
         
-        # Create transcript summary object
-        transcript_summary = {
-            'id': str(uuid.uuid4()),
-            'title': title,
-            'date': datetime.now().isoformat(),
-            'duration': str(duration),
-            'summary': analysis_result.get('summary', ''),
-            'keyTopics': analysis_result.get('keyTopics', []),
-            'transcriptType': source,
-            'analysisResult': analysis_result,
-            'rawTranscript': transcript_text[:500],  # Store first 500 chars for preview
-        }
+        transcript_summary = build_transcript_summary(analysis_result, transcript_text, title, duration, source)
         
         logger.info(f'Transcript processed successfully: {transcript_summary["id"]}')
         
@@ -58,6 +62,14 @@ def process_transcript():
             'message': 'Transcript processed successfully'
         }), 200
         
+    except LLMOverloadedError as e:
+        logger.warning(f'Transcript request rejected by admission control: {str(e)}')
+        response = jsonify({
+            'error': str(e),
+            'retryAfter': e.retry_after
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, e.status_code
     except Exception as e:
         logger.error(f'Error processing transcript: {str(e)}', exc_info=True)
         error_message = str(e)
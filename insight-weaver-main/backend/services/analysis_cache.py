@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache')
+
+
+class AnalysisCache:
+    """Two-tier cache (in-process LRU + SQLite on disk) for LLM analysis results"""
+
+    def __init__(self, db_path: Optional[str] = None, memory_entries: Optional[int] = None,
+                 max_disk_bytes: Optional[int] = None, ttl_seconds: Optional[int] = None):
+        cache_dir = os.getenv('ANALYSIS_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.db_path = db_path or os.path.join(cache_dir, 'analysis_cache.sqlite3')
+        self.memory_entries = memory_entries if memory_entries is not None else int(os.getenv('ANALYSIS_CACHE_MEMORY_ENTRIES', 256))
+        self.max_disk_bytes = max_disk_bytes if max_disk_bytes is not None else int(float(os.getenv('ANALYSIS_CACHE_MAX_MB', 256)) * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.getenv('ANALYSIS_CACHE_TTL', 7 * 24 * 3600))
+
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'near_duplicate_hits': 0,
+            'writes': 0,
+            'evictions': 0,
+            'expired': 0,
+        }
+
+        self._disk_enabled = True
+        try:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    """CREATE TABLE IF NOT EXISTS analysis_cache (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        expires_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )"""
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_access ON analysis_cache(last_access)")
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: On-disk analysis cache disabled ({e}). Using in-memory cache only.")
+            self._disk_enabled = False
+
+    @staticmethod
+    def make_key(content: str, content_type: str, model: str, prompt_version: str,
+                 options: Dict[str, Any]) -> str:
+        """
+        Build a content-addressed cache key.
+
+        Whitespace and unicode normalization are applied to the content so that
+        re-submitting the same material with different line endings or spacing
+        still hits the cache.
+        """
+        normalized = ' '.join(unicodedata.normalize('NFC', content or '').split())
+        key_material = json.dumps({
+            'content_sha256': hashlib.sha256(normalized.encode('utf-8')).hexdigest(),
+            'content_type': content_type or 'text',
+            'model': model,
+            'prompt_version': prompt_version,
+            'options': options or {},
+        }, sort_keys=True)
+        return hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def get(self, key: str, count_hit: bool = True, count_miss: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Return a cached result, or None on miss/expiry.
+
+        Callers that decide the outcome of a lookup themselves (a miss that a
+        near-duplicate may still serve) turn the hit/miss counters off and
+        report it with record_miss()/record_near_duplicate_hit().
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    if count_hit:
+                        self._stats['memory_hits'] += 1
+                    return json.loads(value)
+                del self._memory[key]
+                self._stats['expired'] += 1
+
+        if self._disk_enabled:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT value, expires_at FROM analysis_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        value, expires_at = row
+                        if expires_at > now:
+                            conn.execute("UPDATE analysis_cache SET last_access = ? WHERE key = ?", (now, key))
+                            with self._lock:
+                                if count_hit:
+                                    self._stats['disk_hits'] += 1
+                                self._remember(key, expires_at, value)
+                            return json.loads(value)
+                        conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                        with self._lock:
+                            self._stats['expired'] += 1
+            except sqlite3.Error as e:
+                print(f"Warning: Analysis cache read failed: {e}")
+
+        if count_miss:
+            self.record_miss()
+        return None
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self._stats['misses'] += 1
+
+    def record_near_duplicate_hit(self) -> None:
+        with self._lock:
+            self._stats['near_duplicate_hits'] += 1
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a result in both tiers"""
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        value = json.dumps(result)
+
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self._stats['writes'] += 1
+
+        if self._disk_enabled:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO analysis_cache (key, value, size, created_at, expires_at, last_access) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, value, len(value), now, expires_at, now)
+                    )
+                    self._evict_disk(conn, now)
+            except sqlite3.Error as e:
+                print(f"Warning: Analysis cache write failed: {e}")
+
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        """Insert into the memory LRU (caller holds the lock)"""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _evict_disk(self, conn, now: float) -> None:
+        """Drop expired rows, then least-recently-used rows until under the size cap"""
+        expired = conn.execute("DELETE FROM analysis_cache WHERE expires_at <= ?", (now,)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM analysis_cache").fetchone()[0]
+        evicted = 0
+        if total > self.max_disk_bytes:
+            rows = conn.execute("SELECT key, size FROM analysis_cache ORDER BY last_access ASC").fetchall()
+            for key, size in rows:
+                if total <= self.max_disk_bytes:
+                    break
+                conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                total -= size
+                evicted += 1
+        with self._lock:
+            self._stats['expired'] += max(expired, 0)
+            self._stats['evictions'] += evicted
+
+    def clear(self) -> None:
+        """Remove every cached entry"""
+        with self._lock:
+            self._memory.clear()
+        if self._disk_enabled:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM analysis_cache")
+            except sqlite3.Error as e:
+                print(f"Warning: Analysis cache clear failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and tier sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+
+        hits = stats['memory_hits'] + stats['disk_hits']
+        served = hits + stats['near_duplicate_hits']
+        lookups = served + stats['misses']
+        stats['hits'] = hits
+        stats['hit_rate'] = round(served / lookups, 4) if lookups else 0.0
+
+        stats['disk_enabled'] = self._disk_enabled
+        if self._disk_enabled:
+            try:
+                with self._connect() as conn:
+                    count, size = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_cache"
+                    ).fetchone()
+                stats['disk_entries'] = count
+                stats['disk_bytes'] = size
+            except sqlite3.Error:
+                pass
+        return stats
+
+
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Return the process-wide analysis cache (shared by all blueprints)"""
+    global _cache_instance
+    with _cache_lock:
+        if _cache_instance is None:
+            _cache_instance = AnalysisCache()
+        return _cache_instance
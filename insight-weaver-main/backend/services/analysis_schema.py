@@ -0,0 +1,94 @@
+from typing import Any, Dict
+
+# JSON schemas for Ollama's structured output ("format"), mirroring the
+# response shapes the analysis prompts ask for. Property order matters:
+# Ollama generates properties in schema order, and the summary should come
+# first so streaming clients get it early.
+
+# Depth of the topic tree the prompts describe (topic > subtopic > detail);
+# unrolled instead of a recursive $ref, which not every Ollama version accepts
+TOPIC_TREE_DEPTH = 3
+
+
+def _topic_node_schema(depth: int) -> Dict[str, Any]:
+    node = {
+        'type': 'object',
+        'properties': {
+            'id': {'type': 'string'},
+            'label': {'type': 'string'},
+        },
+        'required': ['id', 'label'],
+    }
+    if depth > 1:
+        node['properties']['children'] = {'type': 'array', 'items': _topic_node_schema(depth - 1)}
+    return node
+
+
+TOPIC_TREE_PROPERTY = {'type': 'array', 'items': _topic_node_schema(TOPIC_TREE_DEPTH)}
+
+KEY_TOPICS_PROPERTY = {'type': 'array', 'items': {'type': 'string'}}
+
+REVISION_VIEW_PROPERTY = {
+    'type': 'object',
+    'properties': {
+        'keyPoints': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'topic': {'type': 'string'},
+                    'explanation': {'type': 'string'},
+                    'thingsToRemember': {'type': 'array', 'items': {'type': 'string'}},
+                },
+                'required': ['topic', 'explanation', 'thingsToRemember'],
+            },
+        },
+    },
+    'required': ['keyPoints'],
+}
+
+FOCUS_SCORES_PROPERTY = {
+    'type': 'array',
+    'items': {
+        'type': 'object',
+        'properties': {
+            'topic': {'type': 'string'},
+            'score': {'type': 'number'},
+            'density': {'type': 'string', 'enum': ['high', 'medium', 'low']},
+        },
+        'required': ['topic', 'score', 'density'],
+    },
+}
+
+ANALYSIS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'summary': {'type': 'string'},
+        'keyTopics': KEY_TOPICS_PROPERTY,
+        'topicTree': TOPIC_TREE_PROPERTY,
+        'revisionView': REVISION_VIEW_PROPERTY,
+        'focusScores': FOCUS_SCORES_PROPERTY,
+    },
+    'required': ['summary', 'keyTopics', 'topicTree', 'revisionView', 'focusScores'],
+}
+
+OVERVIEW_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'summary': {'type': 'string'},
+        'keyTopics': KEY_TOPICS_PROPERTY,
+    },
+    'required': ['summary', 'keyTopics'],
+}
+
+TOPIC_TREE_SCHEMA = {
+    'type': 'object',
+    'properties': {'topicTree': TOPIC_TREE_PROPERTY},
+    'required': ['topicTree'],
+}
+
+REVISION_SCHEMA = {
+    'type': 'object',
+    'properties': {'revisionView': REVISION_VIEW_PROPERTY},
+    'required': ['revisionView'],
+}
@@ -0,0 +1,97 @@
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from services.llm_scheduler import LLMOverloadedError
+
+
+class CircuitOpenError(LLMOverloadedError):
+    """Raised without contacting Ollama while the circuit breaker is open"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(
+            'Ollama is currently unavailable (circuit breaker open). Please retry later.',
+            retry_after=retry_after,
+            status_code=503
+        )
+
+
+class CircuitBreaker:
+    """
+    Fail-fast guard around Ollama calls.
+
+    closed    - calls go through; consecutive failures are counted
+    open      - after failure_threshold consecutive failures, calls are
+                rejected immediately for reset_timeout seconds
+    half_open - after the timeout one probe call is let through; success
+                closes the circuit, failure opens it again
+    """
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        self.failure_threshold = max(1, failure_threshold or int(os.getenv('OLLAMA_BREAKER_THRESHOLD', 5)))
+        self.reset_timeout = reset_timeout if reset_timeout is not None else float(os.getenv('OLLAMA_BREAKER_RESET', 30))
+
+        self._lock = threading.Lock()
+        self._state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._stats = {'opened': 0, 'short_circuited': 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.time())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == 'open' and now - self._opened_at >= self.reset_timeout:
+            self._state = 'half_open'
+            self._probe_in_flight = False
+        return self._state
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may proceed"""
+        now = time.time()
+        with self._lock:
+            state = self._current_state(now)
+            if state == 'closed':
+                return
+            if state == 'half_open' and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self._stats['short_circuited'] += 1
+            remaining = self.reset_timeout - (now - self._opened_at)
+            raise CircuitOpenError(retry_after=max(1, int(math.ceil(remaining))))
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != 'closed':
+                print("Ollama circuit breaker closed")
+            self._state = 'closed'
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == 'half_open' or (self._state == 'closed' and self._failures >= self.failure_threshold):
+                print(f"Warning: Ollama circuit breaker opened after {self._failures} consecutive failure(s)")
+                self._state = 'open'
+                self._opened_at = time.time()
+                self._probe_in_flight = False
+                self._stats['opened'] += 1
+
+    def release(self) -> None:
+        """A call ended without telling us anything about Ollama's health (e.g. it was shed)"""
+        with self._lock:
+            if self._state == 'half_open':
+                self._probe_in_flight = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['state'] = self._current_state(time.time())
+            stats['consecutive_failures'] = self._failures
+        return stats
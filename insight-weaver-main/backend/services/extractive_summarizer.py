@@ -0,0 +1,195 @@
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+from services.token_estimator import estimate_tokens
+
+_PARAGRAPH_SPLIT = re.compile(r'\n\s*\n')
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n(?=\s*(?:[-*•]|\d+[.)])\s)')
+_WORD = re.compile(r"[^\W\d_][\w'-]*")
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren't as at be because been before being below
+between both but by can can't cannot could couldn't did didn't do does doesn't doing don't down during each
+either etc even ever every few for from further get gets got had hadn't has hasn't have haven't having he he'd
+he'll he's her here here's hers herself him himself his how how's however i i'd i'll i'm i've if in into is
+isn't it it's its itself just let's like made make makes many may me might more most much must mustn't my
+myself neither no nor not now of off often on once one only or other ought our ours ourselves out over own
+per rather same say says shall shan't she she'd she'll she's should shouldn't since so some such than that
+that's the their theirs them themselves then there there's therefore these they they'd they'll they're
+they've this those though through thus to too under until up upon us use used uses using very via was wasn't
+we we'd we'll we're we've well were weren't what what's when when's where where's whether which while who
+who's whom why why's will with within without won't would wouldn't yet you you'd you'll you're you've your
+yours yourself yourselves
+""".split())
+
+# Sentences beyond this count are ranked by similarity to the document centroid
+# instead of TextRank, which needs a dense n x n similarity matrix (25 MB at 2500)
+TEXTRANK_MAX_SENTENCES = 2500
+
+
+def split_sentences(text: str) -> List[Tuple[int, str]]:
+    """Split text into (paragraph_index, sentence) pairs in document order"""
+    sentences = []
+    for paragraph_index, paragraph in enumerate(_PARAGRAPH_SPLIT.split(text or '')):
+        for sentence in _SENTENCE_SPLIT.split(paragraph):
+            sentence = ' '.join(sentence.split())
+            if sentence:
+                sentences.append((paragraph_index, sentence))
+    return sentences
+
+
+def content_words(text: str) -> List[str]:
+    """Lower-cased words of a sentence without stopwords and very short words"""
+    return [word for word in _WORD.findall(text.lower()) if len(word) > 2 and word not in STOPWORDS]
+
+
+def _tfidf_vectors(sentence_words: List[List[str]]):
+    """
+    Sparse L2-normalized TF-IDF vectors, one per sentence.
+
+    Returns (row_ids, term_ids, weights, vocabulary size): flat arrays with
+    one entry per distinct term of each sentence, ordered by sentence.
+    Memory grows with the number of words rather than sentences x vocabulary.
+    """
+    vocabulary = {}
+    row_ids, term_ids, counts = [], [], []
+    for row, words in enumerate(sentence_words):
+        for word, count in Counter(words).items():
+            row_ids.append(row)
+            term_ids.append(vocabulary.setdefault(word, len(vocabulary)))
+            counts.append(count)
+
+    row_ids = np.array(row_ids, dtype=np.int64)
+    term_ids = np.array(term_ids, dtype=np.int64)
+    document_frequency = np.bincount(term_ids, minlength=len(vocabulary))
+    idf = np.log((1.0 + len(sentence_words)) / (1.0 + document_frequency)) + 1.0
+    weights = (np.log1p(np.array(counts, dtype=np.float32)) * idf[term_ids]).astype(np.float32)
+    norms = np.sqrt(np.bincount(row_ids, weights=weights * weights, minlength=len(sentence_words)))
+    norms[norms == 0] = 1.0
+    weights /= norms[row_ids].astype(np.float32)
+    return row_ids, term_ids, weights, len(vocabulary)
+
+
+def _similarity_matrix(row_ids, term_ids, weights, vocabulary_size: int, n: int):
+    """Cosine similarity of every sentence pair, accumulated from the postings of each sentence's terms"""
+    order = np.argsort(term_ids, kind='stable')
+    posting_rows = row_ids[order]
+    posting_weights = weights[order]
+    posting_starts = np.searchsorted(term_ids[order], np.arange(vocabulary_size + 1))
+    row_starts = np.searchsorted(row_ids, np.arange(n + 1))
+
+    similarity = np.zeros((n, n), dtype=np.float32)
+    for row in range(n):
+        terms = term_ids[row_starts[row]:row_starts[row + 1]]
+        if not len(terms):
+            continue
+        lengths = posting_starts[terms + 1] - posting_starts[terms]
+        postings = np.concatenate([np.arange(posting_starts[term], posting_starts[term + 1]) for term in terms])
+        contributions = posting_weights[postings] * np.repeat(weights[row_starts[row]:row_starts[row + 1]], lengths)
+        similarity[row] = np.bincount(posting_rows[postings], weights=contributions, minlength=n)
+    return similarity
+
+
+def _textrank(similarity, damping: float = 0.85, iterations: int = 30):
+    np.fill_diagonal(similarity, 0.0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    row_sums[row_sums == 0] = 1.0
+    transition = np.divide(similarity, row_sums, out=similarity)
+
+    n = transition.shape[0]
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-6:
+            return updated
+        scores = updated
+    return scores
+
+
+def score_sentences(sentences: List[str]):
+    """
+    Score sentences by how central they are to the document.
+
+    Uses TextRank over TF-IDF cosine similarity, or similarity to the
+    TF-IDF centroid for very long documents. A mild boost favours the
+    opening sentences, which usually introduce the topic.
+    """
+    n = len(sentences)
+    row_ids, term_ids, weights, vocabulary_size = _tfidf_vectors([content_words(sentence) for sentence in sentences])
+    if n <= TEXTRANK_MAX_SENTENCES:
+        scores = _textrank(_similarity_matrix(row_ids, term_ids, weights, vocabulary_size, n))
+    else:
+        centroid = np.bincount(term_ids, weights=weights, minlength=vocabulary_size) / n
+        scores = np.bincount(row_ids, weights=weights * centroid[term_ids], minlength=n)
+
+    scores = scores / (scores.max() or 1.0)
+    positions = np.arange(len(sentences), dtype=np.float32)
+    return scores * (1.0 + 0.25 / (1.0 + positions / 5.0))
+
+
+def compress_text(text: str, max_tokens: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    Cut text down to about max_tokens by keeping its highest-scoring sentences.
+
+    Selected sentences keep their original order and paragraph breaks.
+    Text that already fits, or that cannot be scored because NumPy is not
+    installed, is returned unchanged.
+
+    Returns:
+        (text, stats) where stats holds originalTokens, compressedTokens,
+        ratio (compressed / original) and the sentence counts
+    """
+    original_tokens = estimate_tokens(text)
+    stats = {
+        'originalTokens': original_tokens,
+        'compressedTokens': original_tokens,
+        'ratio': 1.0,
+        'sentences': None,
+        'keptSentences': None,
+    }
+    if max_tokens <= 0 or original_tokens <= max_tokens or not NUMPY_AVAILABLE:
+        return text, stats
+
+    sentences = split_sentences(text)
+    stats['sentences'] = len(sentences)
+    if len(sentences) < 2:
+        return text, stats
+
+    scores = score_sentences([sentence for _, sentence in sentences])
+    budget = max_tokens
+    kept = []
+    for index in np.argsort(-scores, kind='stable'):
+        cost = estimate_tokens(sentences[index][1]) + 1
+        if cost > budget:
+            continue
+        kept.append(int(index))
+        budget -= cost
+        if budget <= 0:
+            break
+    kept.sort()
+
+    parts = []
+    previous_paragraph = None
+    for index in kept:
+        paragraph_index, sentence = sentences[index]
+        if previous_paragraph is not None:
+            parts.append('\n\n' if paragraph_index != previous_paragraph else ' ')
+        parts.append(sentence)
+        previous_paragraph = paragraph_index
+    compressed = ''.join(parts)
+
+    compressed_tokens = estimate_tokens(compressed)
+    stats.update({
+        'compressedTokens': compressed_tokens,
+        'ratio': round(compressed_tokens / original_tokens, 3) if original_tokens else 1.0,
+        'keptSentences': len(kept),
+    })
+    return compressed, stats
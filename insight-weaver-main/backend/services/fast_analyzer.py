@@ -0,0 +1,222 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from services.extractive_summarizer import STOPWORDS, split_sentences
+
+_TOKEN = re.compile(r"[^\W\d_][\w'-]*|[^\w\s]")
+# Joins the sentences so the whole text is tokenized in one pass; _TOKEN
+# matches it as punctuation, so it also ends a run of content words
+_SENTENCE_BREAK = '\x00'
+
+MAX_PHRASE_WORDS = 3
+MAX_ROOTS = 6
+MAX_CHILDREN = 4
+MAX_KEY_TOPICS = 8
+SUMMARY_SENTENCES = 3
+SUMMARY_MAX_WORDS = 70
+
+
+def _classify(token: str) -> Optional[Tuple[str, str]]:
+    """(word as written, lower-cased) for a content word, None for a stopword or punctuation"""
+    token = token.rstrip("'-")
+    lowered = token.lower()
+    if len(lowered) > 2 and lowered not in STOPWORDS and lowered[0].isalpha():
+        return token, lowered
+    return None
+
+
+def _candidate_phrases(sentences: List[str]) -> Iterator[Tuple[int, Tuple[str, ...], str]]:
+    """
+    RAKE-style candidates: runs of content words delimited by stopwords and punctuation.
+
+    Yields (sentence index, lower-cased word tuple, phrase as written). The
+    sentences are tokenized in one pass and every distinct token is
+    classified once.
+    """
+    text = _SENTENCE_BREAK.join(sentence.replace(_SENTENCE_BREAK, ' ') for sentence in sentences)
+    classified = {}
+    index = 0
+    written, lowered = [], []
+    for token in _TOKEN.findall(text):
+        word = classified.get(token, False)
+        if word is False:
+            word = classified[token] = _classify(token)
+        if word is not None:
+            written.append(word[0])
+            lowered.append(word[1])
+            continue
+        if written:
+            yield from _ngrams(index, written, lowered)
+            written, lowered = [], []
+        if token == _SENTENCE_BREAK:
+            index += 1
+    if written:
+        yield from _ngrams(index, written, lowered)
+
+
+def _ngrams(index: int, written: List[str], lowered: List[str]) -> Iterator[Tuple[int, Tuple[str, ...], str]]:
+    """Candidates of one run: all its n-grams, so "fix carbon dioxide" yields "carbon dioxide" too"""
+    length = len(written)
+    for size in range(1, min(MAX_PHRASE_WORDS, length) + 1):
+        for start in range(length - size + 1):
+            yield index, tuple(lowered[start:start + size]), ' '.join(written[start:start + size])
+
+
+def _stem(word: str) -> str:
+    """Just enough stemming to treat "handler" and "handlers" as one topic"""
+    return word[:-1] if word.endswith('s') and not word.endswith('ss') else word
+
+
+def _is_topic_like(phrase: Tuple[str, ...]) -> bool:
+    """Without POS tags, a lone past participle or adverb ("specified", "quickly") is rarely a topic"""
+    return len(phrase) > 1 or not phrase[0].endswith(('ed', 'ly'))
+
+
+def _display_label(phrase: Tuple[str, ...], surface_forms: Dict[Tuple[str, ...], Counter]) -> str:
+    """Most common original spelling of a phrase, capitalized"""
+    forms = surface_forms.get(phrase)
+    label = forms.most_common(1)[0][0] if forms else ' '.join(phrase)
+    return label[:1].upper() + label[1:]
+
+
+class FastAnalyzer:
+    """
+    Builds a learning map locally, without calling the LLM.
+
+    summary     - the lead sentences of the document
+    keyTopics   - the best keyphrases: RAKE-style candidates (stopword-delimited
+                  word runs and their n-grams) ranked by C-value, which favours
+                  frequent phrases that are not just part of a longer one
+    topicTree   - the top keyphrases as roots; the remaining keyphrases are
+                  attached as children to the root they co-occur with most
+    focusScores - the keyphrases' C-values scaled to 0.0-1.0
+
+    The result has the same summary/keyTopics/topicTree/focusScores shape as
+    an LLM analysis; revisionView is derived by the caller.
+    """
+
+    def analyze(self, content: str) -> Dict[str, Any]:
+        sentences = [sentence for _, sentence in split_sentences(content)]
+
+        phrase_sentences = defaultdict(set)
+        surface_forms = defaultdict(Counter)
+        for index, phrase, written in _candidate_phrases(sentences):
+            phrase_sentences[phrase].add(index)
+            surface_forms[phrase][written] += 1
+
+        ranked, scores = self._rank_phrases(phrase_sentences)
+        topics = self._deduplicate(ranked)
+
+        return {
+            'summary': self._lead_summary(sentences),
+            'keyTopics': [_display_label(phrase, surface_forms) for phrase in topics[:MAX_KEY_TOPICS]],
+            'topicTree': self._build_tree(topics, phrase_sentences, surface_forms),
+            'focusScores': self._focus_scores(topics, scores, surface_forms),
+        }
+
+    @staticmethod
+    def _rank_phrases(phrase_sentences) -> Tuple[List[Tuple[str, ...]], Dict[Tuple[str, ...], float]]:
+        """
+        Rank candidates by C-value: log2(1 + words) x (sentence frequency minus the
+        average frequency of the longer candidates that contain the phrase).
+
+        Returns (candidates best first, C-value of each candidate).
+        """
+        frequency = {phrase: len(indexes) for phrase, indexes in phrase_sentences.items()}
+        nested_total = Counter()
+        nested_count = Counter()
+        for phrase, count in frequency.items():
+            for size in range(1, len(phrase)):
+                for start in range(len(phrase) - size + 1):
+                    inner = phrase[start:start + size]
+                    nested_total[inner] += count
+                    nested_count[inner] += 1
+
+        def score(phrase):
+            count = frequency[phrase]
+            if nested_count[phrase]:
+                count -= nested_total[phrase] / nested_count[phrase]
+            return math.log2(1 + len(phrase)) * count
+
+        candidates = [phrase for phrase in frequency if _is_topic_like(phrase)]
+        # Prefer phrases seen more than once when the document is long enough to repeat itself
+        repeated = [phrase for phrase in candidates if frequency[phrase] > 1]
+        if len(repeated) >= MAX_ROOTS:
+            candidates = repeated
+        scores = {phrase: score(phrase) for phrase in candidates}
+        return sorted(candidates, key=lambda phrase: (-scores[phrase], phrase)), scores
+
+    @staticmethod
+    def _deduplicate(ranked: List[Tuple[str, ...]], limit: int = 40) -> List[Tuple[str, ...]]:
+        """Drop phrases that are contained in (or contain) a better-ranked phrase, ignoring plurals"""
+        kept = []
+        kept_stems = []
+        for phrase in ranked:
+            joined = ' ' + ' '.join(_stem(word) for word in phrase) + ' '
+            if any(joined in other or other in joined for other in kept_stems):
+                continue
+            kept.append(phrase)
+            kept_stems.append(joined)
+            if len(kept) >= limit:
+                break
+        return kept
+
+    @staticmethod
+    def _focus_scores(topics: List[Tuple[str, ...]], scores: Dict[Tuple[str, ...], float],
+                      surface_forms, limit: int = 30) -> List[Dict[str, Any]]:
+        """Keyphrases with their C-value min-max scaled to 0.0-1.0, best first"""
+        topics = topics[:limit]
+        if not topics:
+            return []
+        best = scores[topics[0]]
+        worst = min(scores[phrase] for phrase in topics)
+        focus_scores = []
+        for phrase in topics:
+            score = round((scores[phrase] - worst) / (best - worst), 2) if best > worst else 1.0
+            density = "high" if score >= 0.7 else ("medium" if score >= 0.4 else "low")
+            focus_scores.append({'topic': _display_label(phrase, surface_forms), 'score': score, 'density': density})
+        return focus_scores
+
+    @staticmethod
+    def _lead_summary(sentences: List[str]) -> str:
+        """The first few substantial sentences, which usually state what the text is about"""
+        chosen = []
+        words = 0
+        for sentence in sentences:
+            length = len(sentence.split())
+            if length < 6:
+                continue
+            if chosen and words + length > SUMMARY_MAX_WORDS:
+                break
+            chosen.append(sentence if sentence[-1] in '.!?' else sentence + '.')
+            words += length
+            if len(chosen) >= SUMMARY_SENTENCES:
+                break
+        if not chosen and sentences:
+            chosen = sentences[:1]
+        return ' '.join(chosen)
+
+    @staticmethod
+    def _build_tree(topics: List[Tuple[str, ...]], phrase_sentences, surface_forms) -> List[Dict[str, Any]]:
+        """Cluster keyphrases under the root topic they co-occur with most often"""
+        roots = topics[:MAX_ROOTS]
+        children = defaultdict(list)
+        for phrase in topics[MAX_ROOTS:]:
+            overlaps = [len(phrase_sentences[phrase] & phrase_sentences[root]) for root in roots]
+            if overlaps and max(overlaps) > 0:
+                best = overlaps.index(max(overlaps))
+                if len(children[best]) < MAX_CHILDREN:
+                    children[best].append(phrase)
+
+        tree = []
+        for position, root in enumerate(roots, start=1):
+            node = {'id': str(position), 'label': _display_label(root, surface_forms)}
+            if children[position - 1]:
+                node['children'] = [
+                    {'id': f"{position}-{child_position}", 'label': _display_label(child, surface_forms)}
+                    for child_position, child in enumerate(children[position - 1], start=1)
+                ]
+            tree.append(node)
+        return tree
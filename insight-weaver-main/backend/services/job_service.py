@@ -0,0 +1,287 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from services import metrics
+from services.analysis_cache import DEFAULT_CACHE_DIR
+
+
+def _process_start_time(pid: int) -> Optional[float]:
+    """Start time of a process in epoch seconds, where /proc provides it"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # Fields after the parenthesized command name start at field 3 (state)
+            fields = f.read().rpartition(')')[2].split()
+        with open('/proc/stat') as f:
+            boot_time = next(float(line.split()[1]) for line in f if line.startswith('btime'))
+        return boot_time + int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, StopIteration):
+        return None
+
+
+class JobCancelledError(Exception):
+    """Raised inside a job handler when cancellation has been requested"""
+
+
+class JobContext:
+    """Handle passed to job handlers for progress reporting and cancellation checks"""
+
+    def __init__(self, service: 'JobService', job_id: str):
+        self.service = service
+        self.job_id = job_id
+
+    @property
+    def files_dir(self) -> str:
+        return self.service.files_dir
+
+    def set_progress(self, progress: float, message: Optional[str] = None) -> None:
+        self.check_cancelled()
+        self.service._update(self.job_id, progress=max(0.0, min(1.0, progress)), message=message)
+
+    def is_cancelled(self) -> bool:
+        job = self.service.get_job(self.job_id)
+        return bool(job and job['cancelRequested'])
+
+    def check_cancelled(self) -> None:
+        if self.is_cancelled():
+            raise JobCancelledError('Job was cancelled')
+
+
+class JobService:
+    """
+    Background job runner backed by a SQLite job store.
+
+    Jobs are submitted with a kind and a JSON payload, executed by a thread
+    pool and tracked in SQLite so that any worker process can report their
+    status. Jobs left queued or running by a process that has since exited
+    are picked up again when a new JobService starts.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, workers: Optional[int] = None):
+        jobs_dir = os.getenv('JOBS_DIR', os.path.join(DEFAULT_CACHE_DIR, 'jobs'))
+        self.db_path = db_path or os.path.join(jobs_dir, 'jobs.sqlite3')
+        self.files_dir = os.path.join(os.path.dirname(self.db_path), 'files')
+        self.workers = max(1, workers or int(os.getenv('JOB_WORKERS', 2)))
+        self.retention_seconds = int(os.getenv('JOB_RETENTION', 24 * 3600))
+        # The random part tells this process from an earlier one with the same
+        # host and PID, e.g. PID 1 of a restarted container
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+        self._handlers = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job-worker')
+        self._recovered = False
+        self._lock = threading.Lock()
+
+        os.makedirs(self.files_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT,
+                    result TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    owner TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any], JobContext], Any]) -> None:
+        """Register the function that executes jobs of the given kind"""
+        self._handlers[kind] = handler
+
+    @property
+    def kinds(self):
+        return sorted(self._handlers)
+
+    def submit(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a new job and schedule it for execution"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, owner, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), self.owner, now, now)
+            )
+        self._executor.submit(self._run, job_id)
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Request cancellation. Queued jobs are cancelled immediately; running
+        jobs stop at their next progress checkpoint and discard their result.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+                (now, job_id)
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (now, job_id)
+            )
+        return self.get_job(job_id)
+
+    def recover(self) -> int:
+        """Re-queue jobs orphaned by a process that is no longer running"""
+        with self._lock:
+            if self._recovered:
+                return 0
+            self._recovered = True
+
+        self._purge_expired()
+        recovered = 0
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, owner, updated_at FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+        for row in rows:
+            if self._owner_alive(row['owner'], row['updated_at']):
+                continue
+            with self._connect() as conn:
+                claimed = conn.execute(
+                    "UPDATE jobs SET owner = ?, status = 'queued', updated_at = ? WHERE id = ? AND owner IS ?",
+                    (self.owner, time.time(), row['id'], row['owner'])
+                ).rowcount
+            if claimed:
+                self._executor.submit(self._run, row['id'])
+                recovered += 1
+        if recovered:
+            print(f"Recovered {recovered} unfinished job(s) from the job store")
+        return recovered
+
+    @staticmethod
+    def _owner_alive(owner: Optional[str], updated_at: float) -> bool:
+        if not owner or ':' not in owner:
+            return False
+        host, pid = owner.split(':')[:2]
+        if host != socket.gethostname():
+            # Can't check processes on another host; leave its jobs alone
+            return True
+        try:
+            pid = int(pid)
+        except ValueError:
+            return False
+        if pid == os.getpid():
+            # Our PID but not our owner id: an earlier run of this process
+            return False
+        try:
+            os.kill(pid, 0)
+        except OSError:
+            return False
+        # A process that started after the job's last update has reused the owner's PID
+        started_at = _process_start_time(pid)
+        return started_at is None or started_at <= updated_at + 1
+
+    def _run(self, job_id: str) -> None:
+        if not self._claim(job_id):
+            return
+
+        job = self.get_job(job_id)
+        context = JobContext(self, job_id)
+        try:
+            with self._connect() as conn:
+                payload = json.loads(conn.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()[0])
+            with metrics.endpoint_scope(f"job:{job['kind']}"):
+                result = self._handlers[job['kind']](payload, context)
+            context.check_cancelled()
+            self._update(job_id, status='completed', progress=1.0, result=json.dumps(result))
+        except JobCancelledError:
+            self._update(job_id, status='cancelled')
+        except Exception as e:
+            print(f"Job {job_id} ({job['kind']}) failed: {e}")
+            self._update(job_id, status='failed', error=str(e))
+
+    def _claim(self, job_id: str) -> bool:
+        """
+        Move a queued job of ours to running. Only one worker can win: the job
+        may have been cancelled, or re-queued by another process's recovery.
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = 'running', progress = 0, updated_at = ? "
+                "WHERE id = ? AND status = 'queued' AND owner = ? AND cancel_requested = 0",
+                (time.time(), job_id, self.owner)
+            ).rowcount == 1
+
+    def _update(self, job_id: str, **fields) -> None:
+        fields = {key: value for key, value in fields.items() if value is not None}
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f"{key} = ?" for key in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _purge_expired(self) -> None:
+        """Delete finished jobs (and their files) older than the retention period"""
+        cutoff = time.time() - self.retention_seconds
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('completed', 'failed', 'cancelled') AND updated_at < ?",
+                (cutoff,)
+            ).fetchall()
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed', 'cancelled') AND updated_at < ?",
+                (cutoff,)
+            )
+        for row in rows:
+            for name in os.listdir(self.files_dir):
+                if name.startswith(row['id']):
+                    try:
+                        os.remove(os.path.join(self.files_dir, name))
+                    except OSError:
+                        pass
+
+    @staticmethod
+    def _to_dict(row) -> Dict[str, Any]:
+        return {
+            'id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'progress': row['progress'],
+            'message': row['message'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'cancelRequested': bool(row['cancel_requested']),
+            'createdAt': row['created_at'],
+            'updatedAt': row['updated_at'],
+        }
+
+
+_job_service_instance = None
+_job_service_lock = threading.Lock()
+
+
+def get_job_service() -> JobService:
+    """Return the process-wide job service"""
+    global _job_service_instance
+    with _job_service_lock:
+        if _job_service_instance is None:
+            _job_service_instance = JobService()
+        return _job_service_instance
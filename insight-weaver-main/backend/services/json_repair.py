@@ -0,0 +1,191 @@
+import re
+from typing import List, Optional, Tuple
+
+_LITERALS = {
+    'true': 'true', 'false': 'false', 'null': 'null',
+    'True': 'true', 'False': 'false', 'None': 'null',
+}
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?$')
+_TOKEN_CHARS = set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789+-.')
+_CLOSERS = {'{': '}', '[': ']'}
+_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t'}
+
+
+def _next_significant(text: str, index: int) -> Optional[str]:
+    """First non-whitespace character at or after index, or None at the end"""
+    length = len(text)
+    while index < length and text[index] in ' \t\r\n':
+        index += 1
+    return text[index] if index < length else None
+
+
+def repair_json(text: str) -> str:
+    """
+    Rewrite almost-JSON produced by an LLM into valid JSON.
+
+    Handles text before and after the top-level value, trailing and missing
+    commas, raw newlines and unescaped quotes inside strings, Python
+    literals, mismatched closing brackets and output that was cut off
+    mid-way. A truncated document keeps every value that was complete before
+    the cut (a half-written string value is kept as-is) and gets its open
+    arrays and objects closed.
+    """
+    start = min((index for index in (text.find('{'), text.find('[')) if index != -1), default=-1)
+    if start == -1:
+        raise ValueError('No JSON object or array found')
+
+    out: List[str] = []
+    # Each open container is [bracket, expecting]; objects expect key/colon/value/comma, arrays value/comma
+    stack: List[List[str]] = []
+    # Output length and container state at the last point where closing everything yields valid JSON
+    safe: Tuple[int, List[List[str]]] = (0, [])
+
+    def mark_safe():
+        nonlocal safe
+        safe = (len(out), [list(entry) for entry in stack])
+
+    def value_completed():
+        if stack:
+            stack[-1][1] = 'comma'
+        mark_safe()
+
+    def before_value() -> bool:
+        """Prepare for a value at the current position; False if a value is not allowed here"""
+        if not stack:
+            return not out
+        bracket, expecting = stack[-1]
+        if expecting == 'comma':
+            # Missing comma between two values
+            out.append(',')
+            expecting = stack[-1][1] = 'key' if bracket == '{' else 'value'
+        return expecting == 'value'
+
+    in_string = False
+    string_is_key = False
+    escaped = False
+    index = start
+    length = len(text)
+    while index < length:
+        char = text[index]
+
+        if in_string:
+            if escaped:
+                out.append(char)
+                escaped = False
+            elif char == '\\':
+                out.append(char)
+                escaped = True
+            elif char == '"':
+                following = _next_significant(text, index + 1)
+                if string_is_key:
+                    closes = following in (':', None) or following == '"'
+                else:
+                    closes = following in (',', '}', ']', None)
+                if closes:
+                    out.append('"')
+                    in_string = False
+                    if string_is_key:
+                        stack[-1][1] = 'colon'
+                    else:
+                        value_completed()
+                else:
+                    out.append('\\"')
+            elif char in _ESCAPES:
+                out.append(_ESCAPES[char])
+            elif char < ' ':
+                out.append(f'\\u{ord(char):04x}')
+            else:
+                out.append(char)
+            index += 1
+            continue
+
+        if char in ' \t\r\n':
+            index += 1
+            continue
+
+        if char == '"':
+            if stack and stack[-1][0] == '{' and stack[-1][1] in ('key', 'comma'):
+                if stack[-1][1] == 'comma':
+                    out.append(',')
+                string_is_key = True
+                out.append('"')
+                in_string = True
+            elif before_value():
+                string_is_key = False
+                out.append('"')
+                in_string = True
+            index += 1
+            continue
+
+        if char in '{[':
+            if before_value():
+                out.append(char)
+                stack.append([char, 'key' if char == '{' else 'value'])
+                mark_safe()
+            index += 1
+            continue
+
+        if char in '}]':
+            opener = '{' if char == '}' else '['
+            if any(entry[0] == opener for entry in stack):
+                if stack[-1][1] in ('colon', 'value') and stack[-1][0] == '{' or out and out[-1] == ':':
+                    # Key without a value: drop back to the last complete member
+                    out[:] = out[:safe[0]]
+                    stack[:] = [list(entry) for entry in safe[1]]
+                while out and out[-1] == ',':
+                    out.pop()
+                while stack and stack[-1][0] != opener:
+                    out.append(_CLOSERS[stack.pop()[0]])
+                if stack:
+                    stack.pop()
+                    out.append(char)
+                    value_completed()
+                if not stack:
+                    break
+            index += 1
+            continue
+
+        if char == ':':
+            if stack and stack[-1][1] == 'colon':
+                out.append(':')
+                stack[-1][1] = 'value'
+            index += 1
+            continue
+
+        if char == ',':
+            if stack and stack[-1][1] == 'comma':
+                out.append(',')
+                stack[-1][1] = 'key' if stack[-1][0] == '{' else 'value'
+            index += 1
+            continue
+
+        # Bare token: number or literal
+        end = index
+        while end < length and text[end] in _TOKEN_CHARS:
+            end += 1
+        if end == index:
+            index += 1
+            continue
+        token = text[index:end]
+        value = _LITERALS.get(token) or (token if _NUMBER.match(token) else None)
+        if value is not None and end < length and before_value():
+            out.append(value)
+            value_completed()
+        index = end
+
+    if stack:
+        if in_string and not string_is_key:
+            # Keep the text of a value cut off mid-string
+            if escaped:
+                out.pop()
+            out.append('"')
+            value_completed()
+        elif in_string or stack[-1][1] in ('colon', 'value', 'key') and out and out[-1] in ',:"':
+            out[:] = out[:safe[0]]
+            stack[:] = [list(entry) for entry in safe[1]]
+        while out and out[-1] == ',':
+            out.pop()
+        while stack:
+            out.append(_CLOSERS[stack.pop()[0]])
+
+    return ''.join(out)
@@ -0,0 +1,106 @@
+import json
+from typing import Any, Dict, List
+
+
+class AnalysisStreamParser:
+    """
+    Incremental scanner for a streamed analysis JSON document.
+
+    Text is fed in arbitrary pieces as the LLM generates it. The scanner
+    tracks string/nesting state so it can report sections as soon as they
+    are complete, without waiting for the whole document:
+
+    - ('summary', str) once the top-level "summary" string closes
+    - ('topicNode', dict) each time a top-level "topicTree" node object closes
+    """
+
+    def __init__(self):
+        self.text = ''
+        self._position = 0
+        self._started = False
+        self._stack = []  # container chars: '{' or '['
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = False
+        self._current_key = None
+        self._node_start = None
+
+    def feed(self, piece: str) -> List[tuple]:
+        """Consume more generated text and return any completed sections"""
+        events = []
+        if not piece:
+            return events
+        self.text += piece
+        text = self.text
+
+        for index in range(self._position, len(text)):
+            char = text[index]
+
+            if not self._started:
+                # Skip code fences or chatter before the JSON object
+                if char == '{':
+                    self._started = True
+                    self._stack.append('{')
+                    self._expect_key = True
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._on_string(text[self._string_start:index + 1], events)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char in '{[':
+                if char == '{' and self._in_topic_tree_array():
+                    self._node_start = index
+                self._stack.append(char)
+            elif char in '}]':
+                if self._stack:
+                    self._stack.pop()
+                if char == '}' and self._node_start is not None and self._in_topic_tree_array():
+                    events.extend(self._emit_node(text[self._node_start:index + 1]))
+                    self._node_start = None
+                if len(self._stack) == 1:
+                    self._expect_key = False
+            elif char == ',' and len(self._stack) == 1:
+                self._expect_key = True
+
+        self._position = len(text)
+        return events
+
+    def _in_topic_tree_array(self) -> bool:
+        return self._stack == ['{', '['] and self._current_key == 'topicTree'
+
+    def _on_string(self, literal: str, events: List[tuple]) -> None:
+        if len(self._stack) != 1:
+            return
+        try:
+            value = json.loads(literal)
+        except json.JSONDecodeError:
+            return
+        if self._expect_key:
+            self._current_key = value
+            self._expect_key = False
+        elif self._current_key == 'summary':
+            events.append(('summary', value))
+
+    @staticmethod
+    def _emit_node(literal: str) -> List[tuple]:
+        try:
+            node = json.loads(literal)
+        except json.JSONDecodeError:
+            return []
+        return [('topicNode', node)] if isinstance(node, dict) else []
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
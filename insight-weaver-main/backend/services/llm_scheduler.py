@@ -0,0 +1,221 @@
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+
+class LLMOverloadedError(Exception):
+    """Raised when a request is rejected by admission control"""
+
+    def __init__(self, message: str, retry_after: int, status_code: int = 503):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+class _Waiter:
+    def __init__(self):
+        self.granted = threading.Event()
+
+
+class _Admission:
+    """Queueing state shared by all generations of one analysis request"""
+
+    def __init__(self, background: bool = False):
+        self.background = background
+        self.admitted = False
+
+
+# Admission of the analysis request the current thread is working for
+_current_admission = contextvars.ContextVar('llm_admission', default=None)
+
+
+class LLMScheduler:
+    """
+    Admission control in front of Ollama.
+
+    At most max_concurrency generations run at once (match this to Ollama's
+    OLLAMA_NUM_PARALLEL). Further requests wait in a bounded FIFO queue.
+    A request is rejected immediately when the queue is full (429) or when
+    its estimated wait already exceeds its deadline (503), and a queued
+    request that is still waiting at its deadline is rejected (503). Every
+    rejection carries a Retry-After estimate.
+
+    Inside request(), only the first generation of an analysis is subject
+    to the queue limit and deadline; further generations of the same
+    analysis (other chunks, sections) wait as long as it takes.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, max_queue: Optional[int] = None,
+                 queue_timeout: Optional[float] = None):
+        self.max_concurrency = max(1, max_concurrency or int(os.getenv('OLLAMA_NUM_PARALLEL', 1)))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv('LLM_QUEUE_SIZE', 8))
+        self.queue_timeout = queue_timeout if queue_timeout is not None else float(os.getenv('LLM_QUEUE_TIMEOUT', 60))
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queue = deque()
+        # Moving average of how long one generation holds a slot, for wait estimates
+        self._avg_service_time = float(os.getenv('LLM_EXPECTED_SERVICE_TIME', 30))
+        self._stats = {
+            'admitted': 0,
+            'queued': 0,
+            'rejected_queue_full': 0,
+            'rejected_deadline': 0,
+            'completed': 0,
+        }
+
+    def _estimate_wait(self, position: int) -> float:
+        """Seconds until a request at the given queue position gets a slot (caller holds lock)"""
+        rounds = math.ceil((position + 1) / self.max_concurrency)
+        return rounds * self._avg_service_time
+
+    def _retry_after(self) -> int:
+        return max(1, int(math.ceil(self._estimate_wait(len(self._queue)))))
+
+    @contextmanager
+    def request(self, background: bool = False):
+        """
+        Scope of one analysis request, which may need several generations.
+
+        Once the request's first generation has been admitted, the others
+        are never rejected, so finished chunks are not thrown away because a
+        sibling waited too long. Background requests (jobs) are never
+        rejected at all. Threads working for the request must run in a copy
+        of the caller's context (contextvars.copy_context()). Nested scopes
+        join the outer one.
+        """
+        if _current_admission.get() is not None:
+            yield
+            return
+        token = _current_admission.set(_Admission(background))
+        try:
+            yield
+        finally:
+            _current_admission.reset(token)
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None):
+        """Hold one Ollama generation slot for the duration of the block"""
+        waited = self.acquire(timeout)
+        started = time.time()
+        try:
+            yield waited
+        finally:
+            self.release(time.time() - started)
+
+    @staticmethod
+    def _exempt(admission: Optional[_Admission]) -> bool:
+        """Whether a generation may wait without queue limit and deadline"""
+        return admission is not None and (admission.background or admission.admitted)
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """Wait for a slot and return the seconds spent queued"""
+        timeout = self.queue_timeout if timeout is None else timeout
+        admission = _current_admission.get()
+        enqueued_at = time.time()
+
+        with self._lock:
+            if self._active < self.max_concurrency and not self._queue:
+                self._active += 1
+                self._stats['admitted'] += 1
+                if admission is not None:
+                    admission.admitted = True
+                return 0.0
+
+            exempt = self._exempt(admission)
+            if not exempt and len(self._queue) >= self.max_queue:
+                self._stats['rejected_queue_full'] += 1
+                raise LLMOverloadedError(
+                    'LLM queue is full. Please retry later.',
+                    retry_after=self._retry_after(),
+                    status_code=429
+                )
+
+            if not exempt and self._estimate_wait(len(self._queue)) > timeout:
+                self._stats['rejected_deadline'] += 1
+                raise LLMOverloadedError(
+                    'LLM is busy and cannot serve this request in time. Please retry later.',
+                    retry_after=self._retry_after()
+                )
+
+            waiter = _Waiter()
+            self._queue.append(waiter)
+            self._stats['queued'] += 1
+
+        deadline = None if exempt else enqueued_at + timeout
+        while not waiter.granted.wait(None if deadline is None else max(0.0, deadline - time.time())):
+            with self._lock:
+                if waiter.granted.is_set():
+                    # Granted between the timeout and taking the lock
+                    break
+                if self._exempt(admission):
+                    # A sibling generation got the request admitted meanwhile
+                    deadline = None
+                    continue
+                self._queue.remove(waiter)
+                self._stats['rejected_deadline'] += 1
+                retry_after = self._retry_after()
+            raise LLMOverloadedError(
+                'Timed out waiting for an LLM slot. Please retry later.',
+                retry_after=retry_after
+            )
+
+        if admission is not None:
+            admission.admitted = True
+        return time.time() - enqueued_at
+
+    def release(self, service_time: Optional[float] = None) -> None:
+        """Free a slot, handing it directly to the oldest queued request"""
+        with self._lock:
+            self._stats['completed'] += 1
+            if service_time is not None:
+                self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * service_time
+            if self._queue:
+                waiter = self._queue.popleft()
+                self._stats['admitted'] += 1
+                waiter.granted.set()
+            else:
+                self._active -= 1
+
+    def predicted_latency(self) -> Dict[str, float]:
+        """Estimated queue wait and generation time for a request arriving now"""
+        with self._lock:
+            if self._active < self.max_concurrency and not self._queue:
+                wait = 0.0
+            else:
+                wait = self._estimate_wait(len(self._queue))
+            return {
+                'wait': wait,
+                'service': self._avg_service_time,
+                'queueFull': len(self._queue) >= self.max_queue,
+            }
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'active': self._active,
+                'queue_depth': len(self._queue),
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'avg_service_time': round(self._avg_service_time, 3),
+            })
+        return stats
+
+
+_scheduler_instance = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Return the process-wide LLM scheduler"""
+    global _scheduler_instance
+    with _scheduler_lock:
+        if _scheduler_instance is None:
+            _scheduler_instance = LLMScheduler()
+        return _scheduler_instance
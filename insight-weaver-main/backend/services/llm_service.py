@@ -1,25 +1,32 @@
 import requests
+import contextvars
 import json
 import os
-from typing import Dict, Any
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from services.analysis_cache import AnalysisCache, get_analysis_cache
+from services.analysis_schema import ANALYSIS_SCHEMA, OVERVIEW_SCHEMA, REVISION_SCHEMA, TOPIC_TREE_SCHEMA
+from services.extractive_summarizer import NUMPY_AVAILABLE, compress_text
+from services.fast_analyzer import FastAnalyzer
+from services.json_repair import repair_json
+from services.json_stream import AnalysisStreamParser
+from services import metrics
+from services.model_keeper import get_model_keeper
+from services.near_duplicate_index import get_near_duplicate_index, minhash_signature
+from services.ollama_client import OllamaAPIError, OllamaBackend, OllamaClient, get_ollama_client
+from services.llm_scheduler import LLMOverloadedError, get_llm_scheduler
+from services.load_shedder import TIER_COMPRESSED, TIER_FALLBACK_MODEL, TIER_FAST, TIER_FULL, get_load_shedder
+from services.single_flight import get_single_flight
+from services.text_chunker import split_into_chunks
+from services.token_estimator import ContextSizer
 
-class LLMService:
-    def __init__(self):
-        self.api_url = os.getenv('OLLAMA_API_URL', 'http://localhost:11434')
-        self.model = os.getenv('OLLAMA_MODEL', 'llama2')
-    
-    def analyze_content(self, content: str, content_type: str = "text") -> Dict[str, Any]:
-        """
-        Analyze content using Ollama LLM and return structured analysis.
-        
-        Args:
-            content: The text content to analyze
-            content_type: Type of content (text, pdf, etc.)
-            
-        Returns:
-            Dictionary with summary, keyTopics, and topicTree
-        """
-        system_prompt = """You are an expert educational content analyzer. Your task is to analyze text content and extract a structured learning map.
+# Bump whenever the system prompt or post-processing changes so that cached
+# analyses produced by the old prompt are no longer served.
+PROMPT_VERSION = "1"
+
+ANALYSIS_SYSTEM_PROMPT = """You are an expert educational content analyzer. Your task is to analyze text content and extract a structured learning map.
 
 IMPORTANT: You MUST respond with ONLY valid JSON, no markdown, no code blocks, no explanation text.
 
@@ -71,117 +78,1002 @@ IMPORTANT:
 
 Create a comprehensive hierarchical structure that captures the relationships between concepts. Make it educational and easy to navigate."""
 
-        user_prompt = f"Analyze this {content_type or 'text'} content and create a learning map:\n\n{content}"
+# Section prompts for ANALYZE_PLAN=parallel: overview and topic tree are generated
+# concurrently, then revision notes are written from the (short) tree outline.
+OVERVIEW_SYSTEM_PROMPT = """You are an expert educational content analyzer. Your task is to summarize text content for a learning map.
+
+IMPORTANT: You MUST respond with ONLY valid JSON, no markdown, no code blocks, no explanation text.
+
+Extract:
+1. A concise summary (2-3 sentences)
+2. Key topics (5-8 main concepts as strings)
+
+The response must be valid JSON with this exact structure:
+{
+  "summary": "A brief 2-3 sentence summary of the main content",
+  "keyTopics": ["Topic 1", "Topic 2", "Topic 3", "Topic 4", "Topic 5"]
+}"""
+
+TOPIC_TREE_SYSTEM_PROMPT = """You are an expert educational content analyzer. Your task is to extract a hierarchical topic tree from text content.
+
+IMPORTANT: You MUST respond with ONLY valid JSON, no markdown, no code blocks, no explanation text.
+
+The response must be valid JSON with this exact structure:
+{
+  "topicTree": [
+    {
+      "id": "1",
+      "label": "Main Topic 1",
+      "children": [
+        {
+          "id": "1-1",
+          "label": "Subtopic 1.1",
+          "children": [
+            { "id": "1-1-1", "label": "Detail 1.1.1" }
+          ]
+        }
+      ]
+    }
+  ]
+}
+
+Create a comprehensive hierarchical structure that captures the relationships between concepts. Make it educational and easy to navigate."""
+
+REVISION_SYSTEM_PROMPT = """You are an expert educational content analyzer. Your task is to turn the outline of a learning map into exam-ready revision notes.
+
+IMPORTANT: You MUST respond with ONLY valid JSON, no markdown, no code blocks, no explanation text.
+
+The response must be valid JSON with this exact structure:
+{
+  "revisionView": {
+    "keyPoints": [
+      {
+        "topic": "Topic Name",
+        "explanation": "Short 1-2 sentence explanation",
+        "thingsToRemember": ["Point 1", "Point 2"]
+      }
+    ]
+  }
+}
+
+Write one key point for each main topic and important subtopic of the outline."""
+
+ANALYSIS_PLANS = ('single', 'parallel')
+
+# Upper bound on the sentences of a summary merged from chunk summaries
+MERGED_SUMMARY_SENTENCES = 6
+
+
+class CacheLookup:
+    """Outcome of one request's analysis cache lookup, passed down so the cache is consulted once"""
+
+    def __init__(self, key: str, content: str, compress_tokens: int):
+        self.key = key
+        self.compress_tokens = compress_tokens
+        self.result = None
+        self._content = content
+        self._signature = None
+        self._signed = False
+
+    @property
+    def signature(self):
+        """MinHash signature of the content, computed at most once per request"""
+        if not self._signed:
+            self._signature = minhash_signature(self._content)
+            self._signed = True
+        return self._signature
+
+
+class LLMService:
+    def __init__(self, client: OllamaClient = None, model: str = None):
+        self.client = client or get_ollama_client()
+        self.api_url = self.client.base_url
+        self.model = model or os.getenv('OLLAMA_MODEL', 'llama2')
+        self.options = {
+            "temperature": 0.7,
+            "top_p": 0.9
+        }
+        self.max_retries = max(0, int(os.getenv('OLLAMA_MAX_RETRIES', 3)))
+        self.retry_budget = float(os.getenv('OLLAMA_RETRY_BUDGET', 10))
+        chunk_tokens_setting = os.getenv('ANALYZE_CHUNK_TOKENS')
+        self.chunk_tokens = int(chunk_tokens_setting or 3000)
+        self.chunk_workers = max(1, int(os.getenv('ANALYZE_CHUNK_WORKERS', 2)))
+        self.structured_output = os.getenv('OLLAMA_STRUCTURED_OUTPUT', 'schema').lower()
+        if self.structured_output not in ('schema', 'json', 'off'):
+            print(f"Warning: Unknown OLLAMA_STRUCTURED_OUTPUT {self.structured_output!r}; using 'schema'")
+            self.structured_output = 'schema'
+        self.analysis_plan = os.getenv('ANALYZE_PLAN', 'single').lower()
+        if self.analysis_plan not in ANALYSIS_PLANS:
+            print(f"Warning: Unknown ANALYZE_PLAN {self.analysis_plan!r}; using 'single'")
+            self.analysis_plan = 'single'
+        self.context_sizer = ContextSizer()
+        # A chunk must fit into the largest context window next to the system prompt and the output
+        fit_tokens = max(256, self.context_sizer.max_content_tokens(ANALYSIS_SYSTEM_PROMPT))
+        if self.chunk_tokens > fit_tokens:
+            if chunk_tokens_setting:
+                print(f"Warning: ANALYZE_CHUNK_TOKENS={self.chunk_tokens} does not fit into "
+                      f"OLLAMA_MAX_CTX={self.context_sizer.max_ctx}; using {fit_tokens}")
+            self.chunk_tokens = fit_tokens
+        self.compress_tokens = max(0, int(os.getenv('ANALYZE_COMPRESS_TOKENS', 0)))
+        if self.compress_tokens and not NUMPY_AVAILABLE:
+            print("Warning: ANALYZE_COMPRESS_TOKENS is set but numpy is not installed; content will not be compressed")
+        cache_enabled = os.getenv('ANALYSIS_CACHE_ENABLED', 'True').lower() == 'true'
+        self.cache = get_analysis_cache() if cache_enabled else None
+        near_duplicates_enabled = os.getenv('NEAR_DUPLICATE_ENABLED', 'True').lower() == 'true'
+        self.near_duplicates = get_near_duplicate_index() if cache_enabled and near_duplicates_enabled else None
+        self.single_flight = get_single_flight()
+        self.scheduler = get_llm_scheduler()
+        self.keeper = get_model_keeper()
+        self.fast_analyzer = FastAnalyzer()
+        self.load_shedder = get_load_shedder()
+        self._fallback_service = None
+    
+    def analyze_content(self, content: str, content_type: str = "text",
+                        compress_tokens: Optional[int] = None,
+                        lookup: Optional[CacheLookup] = None) -> Dict[str, Any]:
+        """
+        Analyze content using Ollama LLM and return structured analysis.
+        
+        Results are served from the analysis cache when the same (or nearly
+        the same) content was analyzed before with the same model, prompt
+        version and options, and concurrent requests for the same content
+        share one generation.
+        
+        Args:
+            content: The text content to analyze
+            content_type: Type of content (text, pdf, etc.)
+            compress_tokens: Extractive compression budget in tokens; 0 disables
+                compression, None uses ANALYZE_COMPRESS_TOKENS
+            lookup: The caller's cache lookup for these settings, if it already
+                made one
+            
+        Returns:
+            Dictionary with summary, keyTopics, and topicTree
+        """
+        lookup = lookup or self._lookup(content, content_type, compress_tokens)
+        if lookup.result is not None:
+            return lookup.result
+        
+        # Identical requests arriving while this one is generating wait for it
+        # instead of starting their own Ollama generation
+        return self.single_flight.do(
+            lookup.key, lambda: self._analyze_and_store(lookup, content, content_type)
+        )
+    
+    def analyze_adaptive(self, content: str, content_type: str = "text", tier: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Analyze content for an interactive request, degrading under load.
+        
+        A cached full analysis is always served. Otherwise the load shedder
+        picks the best tier that is expected to meet the latency SLO, and a
+        request the LLM queue rejects falls back to the fast tier. The tier
+        is reported as analysisMeta.tier.
+        """
+        lookup = None
+        if tier is None:
+            lookup = self._lookup(content, content_type)
+            if lookup.result is not None:
+                return self._tag_tier(lookup.result, TIER_FULL)
+            tier = self.load_shedder.choose_tier()
         
         try:
-            # Try using chat API first (supports system messages)
-            # Fall back to generate API if chat is not available
+            return self._tag_tier(self._analyze_tier(tier, content, content_type, lookup), tier)
+        except LLMOverloadedError as e:
+            if not self.load_shedder.enabled or tier == TIER_FAST:
+                raise
+            print(f"Warning: {tier} analysis was shed ({str(e)}); serving the fast tier")
+            return self._tag_tier(self.analyze_fast(content, content_type), TIER_FAST)
+    
+    def stream_adaptive(self, content: str, content_type: str = "text") -> Iterator[Tuple[str, Any]]:
+        """
+        stream_analysis with the load shedding of analyze_adaptive.
+        
+        Degraded tiers are not streamed token by token; their finished result
+        is replayed as the same events.
+        """
+        lookup = self._lookup(content, content_type)
+        tier = TIER_FULL if lookup.result is not None else self.load_shedder.choose_tier()
+        if tier == TIER_FULL:
+            started = False
             try:
-                response = requests.post(
-                    f"{self.api_url}/api/chat",
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.7,
-                            "top_p": 0.9
-                        }
-                    },
-                    timeout=120  # 2 minute timeout
-                )
+                for event, data in self.stream_analysis(content, content_type, lookup=lookup):
+                    started = True
+                    if event == 'result':
+                        self._tag_tier(data, TIER_FULL)
+                    yield (event, data)
+                return
+            except LLMOverloadedError as e:
+                if started or not self.load_shedder.enabled:
+                    raise
+                print(f"Warning: streaming analysis was shed ({str(e)}); serving the fast tier")
+                tier = TIER_FAST
+        
+        yield from self.replay_events(self.analyze_adaptive(content, content_type, tier=tier))
+    
+    def _lookup(self, content: str, content_type: str, compress_tokens: Optional[int] = None) -> CacheLookup:
+        """Look the content up once; None compress_tokens means the default settings"""
+        compress_tokens = self.compress_tokens if compress_tokens is None else compress_tokens
+        lookup = CacheLookup(self._cache_key(content, content_type, compress_tokens), content, compress_tokens)
+        if self.cache is not None:
+            lookup.result = self._cached_result(lookup, content_type)
+        return lookup
+    
+    def _cached_result(self, lookup: CacheLookup, content_type: str) -> Optional[Dict[str, Any]]:
+        """Cached analysis of this content, or of a near-duplicate analyzed with the same settings"""
+        if self.near_duplicates is None:
+            return self.cache.get(lookup.key)
+        cached_result = self.cache.get(lookup.key, count_miss=False)
+        if cached_result is not None:
+            return cached_result
+        
+        match = self.near_duplicates.find(lookup.signature, self._cache_scope(content_type, lookup.compress_tokens))
+        cached_result = None
+        if match is not None:
+            similar_key, similarity = match
+            cached_result = self.cache.get(similar_key, count_hit=False, count_miss=False)
+            if cached_result is None:
+                # The stored analysis expired or was evicted
+                self.near_duplicates.remove(similar_key)
+        if cached_result is None:
+            self.cache.record_miss()
+            return None
+        
+        self.cache.record_near_duplicate_hit()
+        cached_result.setdefault('analysisMeta', {})['nearDuplicate'] = {'similarity': round(similarity, 3)}
+        # Resubmitting this exact content is a plain cache hit from now on
+        self.cache.set(lookup.key, cached_result)
+        return cached_result
+    
+    def _analyze_tier(self, tier: str, content: str, content_type: str,
+                      lookup: Optional[CacheLookup] = None) -> Dict[str, Any]:
+        """Analyze at the given tier; lookup is the miss of the full tier's cache lookup"""
+        if tier == TIER_FAST:
+            return self.analyze_fast(content, content_type)
+        if tier == TIER_COMPRESSED:
+            return self.analyze_content(content, content_type, compress_tokens=self.load_shedder.compress_tokens)
+        if tier == TIER_FALLBACK_MODEL:
+            return self._get_fallback_service().analyze_content(content, content_type)
+        return self.analyze_content(content, content_type, lookup=lookup)
+    
+    def _get_fallback_service(self) -> 'LLMService':
+        if self._fallback_service is None:
+            self._fallback_service = LLMService(client=self.client, model=self.load_shedder.fallback_model)
+        return self._fallback_service
+    
+    def _tag_tier(self, analysis_result: Dict[str, Any], tier: str) -> Dict[str, Any]:
+        self.load_shedder.record(tier)
+        analysis_result.setdefault('analysisMeta', {})['tier'] = tier
+        if tier == TIER_FALLBACK_MODEL:
+            analysis_result['analysisMeta']['model'] = self.load_shedder.fallback_model
+        return analysis_result
+    
+    def analyze_fast(self, content: str, content_type: str = "text") -> Dict[str, Any]:
+        """
+        Build a learning map locally, without calling Ollama (mode=fast).
+        
+        Returns the same structure as analyze_content, from keyphrase
+        extraction and lead sentences instead of an LLM generation. Focus
+        scores come from the keyphrase ranking, since the topic tree of a
+        fast analysis is built from the key topics themselves.
+        """
+        started = time.perf_counter()
+        analysis_result = self.fast_analyzer.analyze(content)
+        analysis_result['revisionView'] = self._generate_revision_view(analysis_result)
+        analysis_result['analysisMeta'] = {
+            'mode': 'fast',
+            'durationMs': round((time.perf_counter() - started) * 1000, 1)
+        }
+        return analysis_result
+    
+    def _analyze_and_store(self, lookup: CacheLookup, content: str, content_type: str) -> Dict[str, Any]:
+        # One admission for all generations of this analysis
+        with self.scheduler.request():
+            analysis_result = self._analyze_uncached(content, content_type, lookup.compress_tokens)
+        if not analysis_result['analysisMeta'].get('partial'):
+            self._store(lookup, content_type, analysis_result)
+        return analysis_result
+    
+    def _store(self, lookup: CacheLookup, content_type: str, analysis_result: Dict[str, Any]) -> None:
+        if self.cache is None:
+            return
+        self.cache.set(lookup.key, analysis_result)
+        if self.near_duplicates is not None:
+            self.near_duplicates.add(
+                lookup.key, self._cache_scope(content_type, lookup.compress_tokens), lookup.signature
+            )
+    
+    def _cache_key(self, content: str, content_type: str, compress_tokens: int = 0) -> str:
+        return AnalysisCache.make_key(
+            content, content_type, self.model, PROMPT_VERSION,
+            {**self.options, 'chunk_tokens': self.chunk_tokens,
+             'max_ctx': self.context_sizer.max_ctx, 'max_predict': self.context_sizer.max_predict,
+             'compress_tokens': compress_tokens, 'plan': self.analysis_plan,
+             'structured_output': self.structured_output}
+        )
+    
+    def _cache_scope(self, content_type: str, compress_tokens: int = 0) -> str:
+        """Cache key material without the content: near-duplicates only match within a scope"""
+        return self._cache_key('', content_type, compress_tokens)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Return runtime statistics for the analysis pipeline"""
+        return {
+            'model': self.model,
+            'promptVersion': PROMPT_VERSION,
+            'plan': self.analysis_plan,
+            'cache': self.cache.get_stats() if self.cache else {'enabled': False},
+            'nearDuplicates': self.near_duplicates.get_stats() if self.near_duplicates else {'enabled': False},
+            'singleFlight': self.single_flight.get_stats(),
+            'scheduler': self.scheduler.get_stats(),
+            'backends': self.client.get_status(),
+            'circuitBreaker': self.client.breaker.get_stats(),
+            'context': self.context_sizer.get_config(),
+            'loadShedding': self.load_shedder.get_stats()
+        }
+    
+    def stream_analysis(self, content: str, content_type: str = "text",
+                        compress_tokens: Optional[int] = None,
+                        lookup: Optional[CacheLookup] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Analyze content with Ollama streaming enabled, yielding (event, data) pairs.
+        
+        Events:
+            summary: the summary string, as soon as it has been generated
+            topicNode: each top-level topicTree node once it is complete
+            result: the final validated analysis (same shape as analyze_content)
+        
+        Cached results, content that needs chunked analysis and the parallel
+        plan are replayed as the same sequence of events once the full result
+        is available.
+        """
+        lookup = lookup or self._lookup(content, content_type, compress_tokens)
+        cached_result = lookup.result
+        prompt_content, compression = (content, None) if cached_result else self._compress(content, lookup.compress_tokens)
+        
+        if (cached_result is None and self.analysis_plan == 'single'
+                and len(split_into_chunks(prompt_content, self.chunk_tokens)) <= 1):
+            user_prompt = f"Analyze this {content_type or 'text'} content and create a learning map:\n\n{prompt_content}"
+            parser = AnalysisStreamParser()
+            breaker = self.client.breaker
+            breaker.before_call()
+            # What the generation told us about Ollama's health: True/False are
+            # recorded on the breaker, None (shed, client gone) frees the probe slot
+            healthy = None
+            try:
+                with self.scheduler.slot() as waited, self.client.lease(self.model) as backend:
+                    metrics.queue_wait.observe(waited)
+                    context_plan = self._plan(backend, ANALYSIS_SYSTEM_PROMPT, user_prompt)
+                    response, mode = self._post_completion(
+                        backend, ANALYSIS_SYSTEM_PROMPT, user_prompt, stream=True,
+                        options=self._sized_options(context_plan),
+                        response_format=self._response_format(ANALYSIS_SCHEMA)
+                    )
+                    with response:
+                        for line in response.iter_lines():
+                            if not line:
+                                continue
+                            chunk = json.loads(line)
+                            if chunk.get('error'):
+                                raise Exception(f"Ollama API error: {chunk['error']}")
+                            if mode == 'chat':
+                                piece = chunk.get('message', {}).get('content', '')
+                            else:
+                                piece = chunk.get('response', '')
+                            for event in parser.feed(piece):
+                                yield event
+                            if chunk.get('done'):
+                                metrics.record_ollama_timings(chunk, mode, self.model)
+                                context_plan['outputTruncated'] = chunk.get('done_reason') == 'length'
+                                break
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    ai_content = result.get('message', {}).get('content', '')
-                elif response.status_code == 404:
-                    # Chat API not available, fall back to generate
-                    raise requests.exceptions.RequestException("Chat API not available")
+                healthy = True
+                if not parser.text:
+                    raise Exception('No content in LLM response')
+                self._report_truncation(context_plan)
+                analysis_result = self._parse_analysis(parser.text, context_plan)
+                analysis_result['analysisMeta'] = self._analysis_meta([context_plan])
+                if compression:
+                    analysis_result['analysisMeta']['compression'] = compression
+            except LLMOverloadedError:
+                raise
+            except OllamaAPIError as e:
+                healthy = e.status_code < 500
+                raise Exception(f'LLM service error: {str(e)}')
+            except requests.exceptions.ConnectionError:
+                healthy = False
+                metrics.ollama_errors.inc(model=self.model, error='connection')
+                raise Exception(f'Cannot connect to Ollama API at {self.api_url}. Make sure Ollama is running.')
+            except requests.exceptions.Timeout:
+                healthy = False
+                metrics.ollama_errors.inc(model=self.model, error='timeout')
+                raise Exception('Request to Ollama API timed out. The model may be too slow.')
+            except Exception as e:
+                if healthy is None:
+                    # The stream broke: an error chunk, a bad NDJSON line, a dropped connection
+                    healthy = False
+                raise Exception(f'LLM service error: {str(e)}')
+            finally:
+                if healthy is True:
+                    breaker.record_success()
+                elif healthy is False:
+                    breaker.record_failure()
                 else:
-                    raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
-            except (requests.exceptions.RequestException, KeyError):
-                # Fallback to generate API (older Ollama versions)
-                response = requests.post(
-                    f"{self.api_url}/api/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": f"{system_prompt}\n\n{user_prompt}",
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.7,
-                            "top_p": 0.9
-                        }
-                    },
-                    timeout=120  # 2 minute timeout
-                )
-                
-                if response.status_code != 200:
-                    raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
-                
-                result = response.json()
-                ai_content = result.get('response', '')
-            
-            if not ai_content:
-                raise Exception('No content in LLM response')
+                    breaker.release()
             
-            # Clean the response - remove markdown code blocks if present
-            cleaned_content = ai_content.strip()
-            if cleaned_content.startswith('```json'):
-                cleaned_content = cleaned_content[7:]
-            elif cleaned_content.startswith('```'):
-                cleaned_content = cleaned_content[3:]
-            if cleaned_content.endswith('```'):
-                cleaned_content = cleaned_content[:-3]
-            cleaned_content = cleaned_content.strip()
-            
-            # Extract JSON from response (sometimes LLM adds text before/after JSON)
-            # Try to find JSON object in the response
-            json_start = cleaned_content.find('{')
-            json_end = cleaned_content.rfind('}') + 1
-            
-            if json_start != -1 and json_end > json_start:
-                cleaned_content = cleaned_content[json_start:json_end]
-            
-            # Parse the JSON response
+            self._store(lookup, content_type, analysis_result)
+            yield ('result', analysis_result)
+            return
+        
+        if cached_result is not None:
+            analysis_result = cached_result
+        else:
+            analysis_result = self.analyze_content(content, content_type, lookup=lookup)
+        yield from self.replay_events(analysis_result)
+    
+    @staticmethod
+    def replay_events(analysis_result: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+        """Emit a finished analysis as the same events stream_analysis produces"""
+        yield ('summary', analysis_result.get('summary', ''))
+        for node in analysis_result.get('topicTree', []):
+            yield ('topicNode', node)
+        yield ('result', analysis_result)
+    
+    def _analyze_uncached(self, content: str, content_type: str = "text",
+                          compress_tokens: int = 0) -> Dict[str, Any]:
+        """
+        Run Ollama generation for the content, compressing it first if a budget is set.
+        
+        Compression statistics are reported under analysisMeta.compression.
+        """
+        content, compression = self._compress(content, compress_tokens)
+        analysis_result = self._analyze_chunks(content, content_type)
+        if compression:
+            analysis_result['analysisMeta']['compression'] = compression
+        return analysis_result
+    
+    def _compress(self, content: str, compress_tokens: int) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Keep only the most informative sentences of content, up to compress_tokens.
+        
+        Returns the (possibly unchanged) content and the compression statistics,
+        or None for the statistics when compression is disabled.
+        """
+        if not compress_tokens:
+            return content, None
+        started = time.perf_counter()
+        compressed, stats = compress_text(content, compress_tokens)
+        stats['durationMs'] = round((time.perf_counter() - started) * 1000, 1)
+        return compressed, stats
+    
+    def _analyze_chunks(self, content: str, content_type: str = "text") -> Dict[str, Any]:
+        """
+        Analyze content, splitting it when it does not fit into one prompt.
+        
+        Content larger than the chunk token budget is split on paragraph and
+        sentence boundaries, the chunks are analyzed concurrently (map) and the
+        per-chunk learning maps are merged into one (reduce).
+        """
+        chunks = split_into_chunks(content, self.chunk_tokens)
+        if len(chunks) <= 1:
+            return self._analyze_chunk(content, content_type)
+        
+        def analyze_part(index: int):
             try:
-                analysis_result = json.loads(cleaned_content)
-            except json.JSONDecodeError as e:
-                # If JSON parsing fails, try to fix common issues
-                print(f"JSON parsing error: {e}")
-                print(f"Cleaned content: {cleaned_content[:500]}...")
-                raise Exception(f'Failed to parse LLM response as JSON: {str(e)}')
-            
-            # Validate the structure
-            if not isinstance(analysis_result, dict):
-                raise Exception('LLM response is not a dictionary')
-            
-            if 'summary' not in analysis_result or 'topicTree' not in analysis_result:
-                raise Exception('LLM response missing required fields (summary, topicTree)')
-            
-            # Ensure keyTopics exists
-            if 'keyTopics' not in analysis_result:
-                analysis_result['keyTopics'] = []
+                return self._analyze_chunk(chunks[index], content_type, part=(index + 1, len(chunks)))
+            except Exception as e:
+                return e
+        
+        with ThreadPoolExecutor(max_workers=min(self.chunk_workers, len(chunks))) as executor:
+            # Each chunk runs in a copy of this context, so it shares the request's admission
+            futures = [executor.submit(contextvars.copy_context().run, analyze_part, index)
+                       for index in range(len(chunks))]
+            outcomes = [future.result() for future in futures]
+        
+        chunk_results = [outcome for outcome in outcomes if not isinstance(outcome, Exception)]
+        failures = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+        if not chunk_results:
+            raise failures[0]
+        overloaded = [failure for failure in failures if isinstance(failure, LLMOverloadedError)]
+        if overloaded:
+            # Don't return (and cache) a partial map just because we shed load
+            raise overloaded[0]
+        merged = self._merge_chunk_results(chunk_results)
+        if failures:
+            print(f"Warning: {len(failures)} of {len(chunks)} chunks failed to analyze; merging the remaining {len(chunk_results)}")
+            # Served, but not cached: the next request retries the missing chunks
+            merged['analysisMeta'].update({'partial': True, 'failedChunks': len(failures), 'totalChunks': len(chunks)})
+        return merged
+    
+    def _analyze_chunk(self, content: str, content_type: str = "text", part=None) -> Dict[str, Any]:
+        """Analyze a single prompt-sized piece of content"""
+        system_prompt = ANALYSIS_SYSTEM_PROMPT
+        
+        if part:
+            user_prompt = (
+                f"Analyze part {part[0]} of {part[1]} of this {content_type or 'text'} content "
+                f"and create a learning map for this part:\n\n{content}"
+            )
+        else:
+            user_prompt = f"Analyze this {content_type or 'text'} content and create a learning map:\n\n{content}"
+        
+        try:
+            if self.analysis_plan == 'parallel':
+                return self._analyze_sections(user_prompt)
             
-            # Ensure revisionView exists (generate if missing)
-            if 'revisionView' not in analysis_result or not analysis_result.get('revisionView'):
-                analysis_result['revisionView'] = self._generate_revision_view(analysis_result)
+            ai_content, context_plan = self._request_completion(system_prompt, user_prompt)
             
-            # Ensure focusScores exists (calculate if missing)
-            if 'focusScores' not in analysis_result or not analysis_result.get('focusScores'):
-                analysis_result['focusScores'] = self._calculate_focus_scores(analysis_result)
+            if not ai_content:
+                raise Exception('No content in LLM response')
             
+            analysis_result = self._parse_analysis(ai_content, context_plan)
+            analysis_result['analysisMeta'] = self._analysis_meta([context_plan])
             return analysis_result
             
+        except LLMOverloadedError:
+            raise
         except requests.exceptions.ConnectionError:
+            metrics.ollama_errors.inc(model=self.model, error='connection')
             raise Exception(f'Cannot connect to Ollama API at {self.api_url}. Make sure Ollama is running.')
         except requests.exceptions.Timeout:
+            metrics.ollama_errors.inc(model=self.model, error='timeout')
             raise Exception('Request to Ollama API timed out. The model may be too slow.')
         except Exception as e:
             raise Exception(f'LLM service error: {str(e)}')
     
+    def _analyze_sections(self, user_prompt: str) -> Dict[str, Any]:
+        """
+        Build a learning map from several small prompts instead of one large one.
+        
+        The overview (summary, keyTopics) and the topicTree are generated
+        concurrently, so with parallel Ollama slots the wall-clock time is
+        that of the longer one. Revision notes are then written from the tree
+        outline alone, and focusScores are derived locally.
+        """
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            overview_future = executor.submit(
+                contextvars.copy_context().run,
+                self._request_section, OVERVIEW_SYSTEM_PROMPT, user_prompt, OVERVIEW_SCHEMA, 512
+            )
+            tree_future = executor.submit(
+                contextvars.copy_context().run,
+                self._request_section, TOPIC_TREE_SYSTEM_PROMPT, user_prompt, TOPIC_TREE_SCHEMA, None
+            )
+            overview, overview_plan = overview_future.result()
+            tree, tree_plan = tree_future.result()
+        
+        if 'summary' not in overview or not isinstance(tree.get('topicTree'), list):
+            raise Exception('LLM response missing required fields (summary, topicTree)')
+        
+        analysis_result = {
+            'summary': overview['summary'],
+            'keyTopics': overview.get('keyTopics') or [],
+            'topicTree': self._sanitize_topic_tree(tree['topicTree']),
+        }
+        context_plans = [overview_plan, tree_plan]
+        
+        outline = self._outline(analysis_result['topicTree'])
+        try:
+            revision, revision_plan = self._request_section(
+                REVISION_SYSTEM_PROMPT, f"Summary: {analysis_result['summary']}\n\nTopic outline:\n{outline}",
+                REVISION_SCHEMA, 1024
+            )
+            context_plans.append(revision_plan)
+            analysis_result['revisionView'] = revision.get('revisionView') or self._generate_revision_view(analysis_result)
+        except LLMOverloadedError:
+            raise
+        except Exception as e:
+            print(f"Warning: Revision notes could not be generated ({str(e)}); deriving them from the topic tree")
+            analysis_result['revisionView'] = self._generate_revision_view(analysis_result)
+        
+        analysis_result['focusScores'] = self._calculate_focus_scores(analysis_result)
+        analysis_result['analysisMeta'] = self._analysis_meta(context_plans)
+        analysis_result['analysisMeta'].update({'chunks': 1, 'plan': 'parallel', 'generations': len(context_plans)})
+        return analysis_result
+    
+    def _request_section(self, system_prompt: str, user_prompt: str, schema: Dict[str, Any],
+                         max_output_tokens: Optional[int]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Generate one section of a learning map and return (parsed JSON object, context plan)"""
+        ai_content, context_plan = self._request_completion(system_prompt, user_prompt, max_output_tokens, schema)
+        if not ai_content:
+            raise Exception('No content in LLM response')
+        section = self._parse_analysis(ai_content, context_plan, parser=self._extract_json)
+        if not isinstance(section, dict):
+            raise Exception('LLM response is not a dictionary')
+        return section, context_plan
+    
+    @staticmethod
+    def _outline(nodes: List[Dict[str, Any]], depth: int = 0) -> str:
+        """Indented list of topic tree labels"""
+        lines = []
+        for node in nodes:
+            lines.append(f"{'  ' * depth}- {node.get('label', '')}")
+            if node.get('children'):
+                lines.append(LLMService._outline(node['children'], depth + 1))
+        return '\n'.join(lines)
+    
+    def _request_completion(self, system_prompt: str, user_prompt: str, max_output_tokens: Optional[int] = None,
+                            schema: Dict[str, Any] = ANALYSIS_SCHEMA) -> Tuple[str, Dict[str, Any]]:
+        """
+        Send the prompts to Ollama and return the raw generated text with its context plan.
+        
+        num_ctx and num_predict are sized to the prompt by the context sizer,
+        within the context length the model was trained on (per backend);
+        the returned plan records whether the prompt or the output was cut.
+        
+        Calls go through the circuit breaker, which rejects them immediately
+        while Ollama is known to be down. Transient connection errors are
+        retried with jittered exponential backoff as long as the retry budget
+        allows; read timeouts are never retried since the model was already
+        busy generating.
+        """
+        response_format = self._response_format(schema)
+        breaker = self.client.breaker
+        retry_deadline = time.monotonic() + self.retry_budget
+        attempt = 0
+        while True:
+            breaker.before_call()
+            try:
+                with self.scheduler.slot() as waited, self.client.lease(self.model) as backend:
+                    metrics.queue_wait.observe(waited)
+                    context_plan = self._plan(backend, system_prompt, user_prompt, max_output_tokens)
+                    response, mode = self._post_completion(
+                        backend, system_prompt, user_prompt, options=self._sized_options(context_plan),
+                        response_format=response_format
+                    )
+                    result = response.json()
+            except requests.exceptions.ConnectionError:
+                # Includes ConnectTimeout: nothing reached the model, so a retry is cheap
+                breaker.record_failure()
+                attempt += 1
+                delay = min(4.0, 0.25 * (2 ** attempt)) * random.uniform(0.5, 1.0)
+                if (attempt > self.max_retries or breaker.state == 'open'
+                        or time.monotonic() + delay > retry_deadline):
+                    raise
+                metrics.ollama_errors.inc(model=self.model, error='retried')
+                time.sleep(delay)
+                continue
+            except requests.exceptions.Timeout:
+                breaker.record_failure()
+                raise
+            except OllamaAPIError as e:
+                if e.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.record_success()
+            break
+        
+        metrics.record_ollama_timings(result, mode, self.model)
+        context_plan['outputTruncated'] = result.get('done_reason') == 'length'
+        self._report_truncation(context_plan)
+        if mode == 'chat':
+            return result.get('message', {}).get('content', ''), context_plan
+        return result.get('response', ''), context_plan
+    
+    def _plan(self, backend: OllamaBackend, system_prompt: str, user_prompt: str,
+              max_output_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Context plan for a generation on this backend, within the model's trained window"""
+        window = self.client.context_window(backend, self.model)
+        return self.context_sizer.plan(system_prompt, user_prompt, max_output_tokens, window=window)
+    
+    def _sized_options(self, context_plan: Dict[str, Any]) -> Dict[str, Any]:
+        return {**self.options, 'num_ctx': context_plan['numCtx'], 'num_predict': context_plan['numPredict']}
+    
+    def _report_truncation(self, context_plan: Dict[str, Any]) -> None:
+        """Log and count generations whose prompt or output did not fit"""
+        if context_plan['truncated']:
+            metrics.llm_truncations.inc(model=self.model, part='prompt')
+            print(f"Warning: Prompt of ~{context_plan['promptTokens']} tokens exceeds num_ctx={context_plan['numCtx']}; "
+                  f"Ollama will truncate it")
+        if context_plan.get('outputTruncated'):
+            metrics.llm_truncations.inc(model=self.model, part='output')
+            print(f"Warning: LLM output was cut off at num_predict={context_plan['numPredict']} tokens")
+    
+    @staticmethod
+    def _analysis_meta(context_plans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Summarize the context sizing of the generations (or chunk analyses) behind one analysis"""
+        return {
+            'chunks': sum(plan.get('chunks', 1) for plan in context_plans),
+            'promptTokens': sum(plan['promptTokens'] for plan in context_plans),
+            'numCtx': max(plan['numCtx'] for plan in context_plans),
+            'numPredict': max(plan['numPredict'] for plan in context_plans),
+            'truncated': any(plan['truncated'] for plan in context_plans),
+            'outputTruncated': any(plan.get('outputTruncated') for plan in context_plans),
+        }
+    
+    def _post_completion(self, backend: OllamaBackend, system_prompt: str, user_prompt: str, stream: bool = False,
+                         options: Dict[str, Any] = None, response_format: Any = None):
+        """
+        POST the prompts to an Ollama backend and return (response, api_mode).
+        
+        The chat API is used unless the backend has been detected to lack it,
+        in which case the generate API is used. Detection happens on the first
+        request (a 404 from /api/chat) and is cached per backend, with
+        periodic re-validation. Timeouts and connection errors are
+        raised as-is and never trigger the fallback.
+        
+        response_format is sent as Ollama's "format": "json" or a JSON schema.
+        A backend that rejects schemas (Ollama before 0.5) gets "json" instead
+        until the rejection is re-validated.
+        """
+        if isinstance(response_format, dict) and not backend.supports_schema_format():
+            response_format = 'json'
+        
+        if backend.get_api_mode() != 'generate':
+            payload = {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                "stream": stream,
+                "options": options or self.options,
+                "keep_alive": self.keeper.keep_alive_value()
+            }
+            if response_format is not None:
+                payload["format"] = response_format
+            response = backend.post("/api/chat", payload, stream=stream)
+            
+            if response.status_code == 404 and not self._is_model_missing(response):
+                # Chat API not available (older Ollama versions), use generate from now on
+                response.close()
+                backend.set_api_mode('generate')
+            else:
+                if self._schema_rejected(backend, response, response_format):
+                    return self._post_completion(backend, system_prompt, user_prompt, stream, options, 'json')
+                if response.status_code != 200:
+                    raise OllamaAPIError(response.status_code, response.text)
+                backend.set_api_mode('chat')
+                if self.model == self.keeper.model:
+                    self.keeper.mark_used(backend)
+                return response, 'chat'
+        
+        payload = {
+            "model": self.model,
+            "prompt": f"{system_prompt}\n\n{user_prompt}",
+            "stream": stream,
+            "options": options or self.options,
+            "keep_alive": self.keeper.keep_alive_value()
+        }
+        if response_format is not None:
+            payload["format"] = response_format
+        response = backend.post("/api/generate", payload, stream=stream)
+        
+        if self._schema_rejected(backend, response, response_format):
+            return self._post_completion(backend, system_prompt, user_prompt, stream, options, 'json')
+        if response.status_code != 200:
+            raise OllamaAPIError(response.status_code, response.text)
+        
+        if self.model == self.keeper.model:
+            self.keeper.mark_used(backend)
+        return response, 'generate'
+    
+    @staticmethod
+    def _schema_rejected(backend: OllamaBackend, response, response_format: Any) -> bool:
+        """
+        Detect (and remember) a backend that rejects a JSON schema format.
+
+        Only a 400 whose error is about the format counts; other bad requests
+        (an unknown option, a malformed prompt) are raised as usual.
+        """
+        if response.status_code != 400 or not isinstance(response_format, dict):
+            return False
+        error = response.text.lower()
+        if 'format' not in error and 'schema' not in error:
+            return False
+        response.close()
+        backend.reject_schema_format()
+        return True
+    
+    def _response_format(self, schema: Dict[str, Any]) -> Any:
+        """Value for Ollama's "format" field under OLLAMA_STRUCTURED_OUTPUT"""
+        if self.structured_output == 'schema':
+            return schema
+        if self.structured_output == 'json':
+            return 'json'
+        return None
+    
+    @staticmethod
+    def _is_model_missing(response) -> bool:
+        """A 404 can also mean the model is not pulled; that is not an API capability issue"""
+        return 'model' in response.text.lower() and 'not found' in response.text.lower()
+    
+    def _parse_analysis(self, ai_content: str, context_plan: Dict[str, Any] = None, parser=None) -> Dict[str, Any]:
+        """Parse and validate the generated JSON, filling in derived sections"""
+        started = time.perf_counter()
+        try:
+            return (parser or self._parse_and_validate)(ai_content)
+        except Exception as e:
+            if context_plan and context_plan.get('outputTruncated'):
+                raise Exception(f"{str(e)} (output was cut off at num_predict={context_plan['numPredict']} tokens)")
+            raise
+        finally:
+            metrics.postprocess_duration.observe(
+                time.perf_counter() - started, model=self.model, endpoint=metrics.current_endpoint()
+            )
+    
+    def _parse_and_validate(self, ai_content: str) -> Dict[str, Any]:
+        analysis_result = self._extract_json(ai_content)
+        
+        # Validate the structure
+        if not isinstance(analysis_result, dict):
+            raise Exception('LLM response is not a dictionary')
+        
+        if 'summary' not in analysis_result or 'topicTree' not in analysis_result:
+            raise Exception('LLM response missing required fields (summary, topicTree)')
+        
+        # Repaired (cut-off) output can end in a half-written node
+        analysis_result['topicTree'] = self._sanitize_topic_tree(analysis_result['topicTree'])
+        
+        # Ensure keyTopics exists
+        if 'keyTopics' not in analysis_result:
+            analysis_result['keyTopics'] = []
+        
+        # Ensure revisionView exists (generate if missing)
+        if 'revisionView' not in analysis_result or not analysis_result.get('revisionView'):
+            analysis_result['revisionView'] = self._generate_revision_view(analysis_result)
+        
+        # Ensure focusScores exists (calculate if missing)
+        if 'focusScores' not in analysis_result or not analysis_result.get('focusScores'):
+            analysis_result['focusScores'] = self._calculate_focus_scores(analysis_result)
+        
+        return analysis_result
+    
+    def _sanitize_topic_tree(self, nodes: Any) -> List[Dict[str, Any]]:
+        """Drop topic tree nodes that are not objects or have no label"""
+        if not isinstance(nodes, list):
+            return []
+        sanitized = []
+        for node in nodes:
+            if not isinstance(node, dict) or not isinstance(node.get('label'), str) or not node['label'].strip():
+                continue
+            if 'children' in node:
+                node['children'] = self._sanitize_topic_tree(node['children'])
+            sanitized.append(node)
+        return sanitized
+    
+    def _extract_json(self, ai_content: str) -> Any:
+        """Pull the JSON object out of an LLM response, tolerating code fences and surrounding text"""
+        # Clean the response - remove markdown code blocks if present
+        cleaned_content = ai_content.strip()
+        if cleaned_content.startswith('```json'):
+            cleaned_content = cleaned_content[7:]
+        elif cleaned_content.startswith('```'):
+            cleaned_content = cleaned_content[3:]
+        if cleaned_content.endswith('```'):
+            cleaned_content = cleaned_content[:-3]
+        cleaned_content = cleaned_content.strip()
+        
+        # Extract JSON from response (sometimes LLM adds text before/after JSON)
+        # Try to find JSON object in the response
+        json_start = cleaned_content.find('{')
+        json_end = cleaned_content.rfind('}') + 1
+        
+        if json_start != -1 and json_end > json_start:
+            try:
+                return json.loads(cleaned_content[json_start:json_end])
+            except json.JSONDecodeError:
+                pass
+        
+        # Repair trailing commas, stray quotes, truncated output and the like
+        # instead of failing the whole (expensive) generation
+        try:
+            analysis_result = json.loads(repair_json(cleaned_content))
+        except ValueError as e:
+            metrics.json_parse_failures.inc(model=self.model)
+            print(f"JSON parsing error: {e}")
+            print(f"Cleaned content: {cleaned_content[:500]}...")
+            raise Exception(f'Failed to parse LLM response as JSON: {str(e)}')
+        
+        metrics.json_repairs.inc(model=self.model)
+        return analysis_result
+    
+    def _merge_chunk_results(self, chunk_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Reduce per-chunk analyses into a single learning map"""
+        def normalize(label: str) -> str:
+            return ' '.join(str(label or '').lower().split())
+        
+        # Summary: keep chunk summaries in document order, shortened when there are many.
+        # Beyond MERGED_SUMMARY_SENTENCES chunks, evenly spaced ones cover the whole document.
+        summaries = [r.get('summary', '').strip() for r in chunk_results if r.get('summary')]
+        if len(summaries) > 3:
+            if len(summaries) > MERGED_SUMMARY_SENTENCES:
+                step = (len(summaries) - 1) / (MERGED_SUMMARY_SENTENCES - 1)
+                summaries = [summaries[round(i * step)] for i in range(MERGED_SUMMARY_SENTENCES)]
+            summaries = [summary.split('. ')[0].rstrip('.') + '.' for summary in summaries]
+        summary = ' '.join(summaries)
+        
+        # Key topics: deduplicate, rank by how many chunks mention them
+        topic_counts = {}
+        topic_labels = {}
+        for r in chunk_results:
+            for topic in r.get('keyTopics', []):
+                key = normalize(topic)
+                if not key:
+                    continue
+                topic_labels.setdefault(key, topic)
+                topic_counts[key] = topic_counts.get(key, 0) + 1
+        ordered_keys = sorted(topic_labels, key=lambda k: -topic_counts[k])
+        key_topics = [topic_labels[k] for k in ordered_keys][:10]
+        
+        # Topic tree: merge nodes with the same label at the same level
+        def merge_nodes(target: List[Dict[str, Any]], nodes: List[Dict[str, Any]]):
+            index = {normalize(node.get('label')): node for node in target}
+            for node in nodes:
+                key = normalize(node.get('label'))
+                if not key:
+                    continue
+                if key in index:
+                    existing = index[key]
+                    if node.get('children'):
+                        existing.setdefault('children', [])
+                        merge_nodes(existing['children'], node['children'])
+                else:
+                    copy = {'label': node.get('label')}
+                    if node.get('children'):
+                        copy['children'] = []
+                        merge_nodes(copy['children'], node['children'])
+                    target.append(copy)
+                    index[key] = copy
+        
+        def renumber(nodes: List[Dict[str, Any]], prefix: str = '') -> List[Dict[str, Any]]:
+            numbered = []
+            for position, node in enumerate(nodes, start=1):
+                node_id = f"{prefix}-{position}" if prefix else str(position)
+                numbered_node = {'id': node_id, 'label': node['label']}
+                if node.get('children'):
+                    numbered_node['children'] = renumber(node['children'], node_id)
+                numbered.append(numbered_node)
+            return numbered
+        
+        merged_tree = []
+        for r in chunk_results:
+            merge_nodes(merged_tree, r.get('topicTree', []))
+        topic_tree = renumber(merged_tree)
+        
+        # Revision points: deduplicate by topic
+        key_points = []
+        seen_points = set()
+        for r in chunk_results:
+            for point in (r.get('revisionView') or {}).get('keyPoints', []):
+                key = normalize(point.get('topic'))
+                if key and key not in seen_points:
+                    seen_points.add(key)
+                    key_points.append(point)
+        
+        # Focus scores: keep the strongest score seen for each topic
+        best_scores = {}
+        for r in chunk_results:
+            for entry in r.get('focusScores', []):
+                key = normalize(entry.get('topic'))
+                if not key:
+                    continue
+                try:
+                    score = float(entry.get('score', 0))
+                except (TypeError, ValueError):
+                    score = 0.0
+                if key not in best_scores or score > best_scores[key]['score']:
+                    best_scores[key] = {'topic': entry.get('topic'), 'score': round(score, 2)}
+        focus_scores = []
+        for entry in best_scores.values():
+            score = entry['score']
+            entry['density'] = "high" if score >= 0.7 else ("medium" if score >= 0.4 else "low")
+            focus_scores.append(entry)
+        focus_scores.sort(key=lambda x: x['score'], reverse=True)
+        
+        return {
+            'summary': summary,
+            'keyTopics': key_topics,
+            'topicTree': topic_tree,
+            'revisionView': {'keyPoints': key_points[:20]},
+            'focusScores': focus_scores[:30],
+            'analysisMeta': self._analysis_meta([r['analysisMeta'] for r in chunk_results])
+        }
+    
     def _generate_revision_view(self, analysis_result: Dict[str, Any]) -> Dict[str, Any]:
         """Generate revision view from analysis result"""
         key_points = []
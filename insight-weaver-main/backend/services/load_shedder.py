@@ -0,0 +1,92 @@
+import os
+import threading
+from typing import Any, Dict
+
+from services.circuit_breaker import CircuitBreaker
+from services.llm_scheduler import LLMScheduler, get_llm_scheduler
+from services.ollama_client import get_ollama_client
+
+# Analysis tiers, from best to cheapest
+TIER_FULL = 'full'
+TIER_FALLBACK_MODEL = 'fallback-model'
+TIER_COMPRESSED = 'compressed'
+TIER_FAST = 'fast'
+
+# Assumed share of a full generation's time that a degraded LLM tier needs
+DEGRADED_COST = 0.5
+
+
+class LoadShedder:
+    """
+    Overload policy for interactive analysis requests.
+
+    Before a request is queued, the predicted latency (queue wait plus the
+    moving average generation time, both from the LLM scheduler) is compared
+    with the latency SLO:
+
+    full            - the prediction is within the SLO
+    fallback-model  - a smaller OLLAMA_FALLBACK_MODEL would still meet it
+    compressed      - without a fallback model: aggressively compressed input
+    fast            - nothing LLM-based can meet it, the queue is full or
+                      the circuit breaker is open: local keyphrase analysis
+    """
+
+    def __init__(self, scheduler: LLMScheduler, breaker: CircuitBreaker):
+        self.scheduler = scheduler
+        self.breaker = breaker
+        self.enabled = os.getenv('ANALYZE_LOAD_SHEDDING', 'True').lower() == 'true'
+        self.latency_slo = float(os.getenv('ANALYZE_LATENCY_SLO', 90))
+        self.fallback_model = os.getenv('OLLAMA_FALLBACK_MODEL') or None
+        self.compress_tokens = max(1, int(os.getenv('ANALYZE_SHED_COMPRESS_TOKENS', 1000)))
+
+        self._lock = threading.Lock()
+        self._tiers = {tier: 0 for tier in (TIER_FULL, TIER_FALLBACK_MODEL, TIER_COMPRESSED, TIER_FAST)}
+
+    @property
+    def degraded_tier(self) -> str:
+        return TIER_FALLBACK_MODEL if self.fallback_model else TIER_COMPRESSED
+
+    def choose_tier(self) -> str:
+        """Pick the best tier expected to answer within the latency SLO"""
+        if not self.enabled:
+            return TIER_FULL
+
+        if self.breaker.state == 'open':
+            return TIER_FAST
+
+        predicted = self.scheduler.predicted_latency()
+        if predicted['queueFull']:
+            return TIER_FAST
+        if predicted['wait'] + predicted['service'] <= self.latency_slo:
+            return TIER_FULL
+        if predicted['wait'] + predicted['service'] * DEGRADED_COST <= self.latency_slo:
+            return self.degraded_tier
+        return TIER_FAST
+
+    def record(self, tier: str) -> None:
+        """Count a request served by the given tier"""
+        with self._lock:
+            self._tiers[tier] = self._tiers.get(tier, 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tiers = dict(self._tiers)
+        return {
+            'enabled': self.enabled,
+            'latencySlo': self.latency_slo,
+            'fallbackModel': self.fallback_model,
+            'tiers': tiers,
+        }
+
+
+_shedder_instance = None
+_shedder_lock = threading.Lock()
+
+
+def get_load_shedder() -> LoadShedder:
+    """Return the process-wide load shedder"""
+    global _shedder_instance
+    with _shedder_lock:
+        if _shedder_instance is None:
+            _shedder_instance = LoadShedder(get_llm_scheduler(), get_ollama_client().breaker)
+        return _shedder_instance
@@ -0,0 +1,254 @@
+import bisect
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from cache hits up to multi-minute CPU generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    metric_type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in items]
+
+
+class Histogram(_Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+            inf = 'le="+Inf"'
+            lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, inf)} {state[-1]}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}')
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Metric whose samples are read from a callback at scrape time"""
+
+    def __init__(self, name, documentation, metric_type: str, labelnames=(),
+                 callback: Optional[Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.metric_type = metric_type
+        self.callback = callback
+
+    def _samples(self):
+        try:
+            samples = list(self.callback()) if self.callback else []
+        except Exception as e:
+            print(f"Warning: Failed to collect metric {self.name}: {e}")
+            samples = []
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in samples]
+
+
+class MetricsRegistry:
+    """Minimal Prometheus text-format registry (no external dependency)"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, name, documentation, metric_type, labelnames=(), callback=None) -> CallbackMetric:
+        """Register a gauge or counter that reads its current samples from a callback"""
+        return self._register(CallbackMetric(name, documentation, metric_type, labelnames, callback))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+# HTTP layer
+http_request_duration = registry.histogram(
+    'insightmap_http_request_duration_seconds', 'Time spent handling API requests', ['endpoint', 'status']
+)
+
+# Ollama generation timings, as reported by Ollama itself
+ollama_total_duration = registry.histogram(
+    'insightmap_ollama_total_duration_seconds', 'Ollama total_duration per generation', ['api', 'model', 'endpoint']
+)
+ollama_load_duration = registry.histogram(
+    'insightmap_ollama_load_duration_seconds', 'Ollama load_duration (model load) per generation', ['api', 'model', 'endpoint']
+)
+ollama_prompt_eval_duration = registry.histogram(
+    'insightmap_ollama_prompt_eval_duration_seconds', 'Ollama prompt_eval_duration per generation', ['api', 'model', 'endpoint']
+)
+ollama_eval_duration = registry.histogram(
+    'insightmap_ollama_eval_duration_seconds', 'Ollama eval_duration (decode) per generation', ['api', 'model', 'endpoint']
+)
+ollama_prompt_tokens = registry.counter(
+    'insightmap_ollama_prompt_tokens_total', 'Prompt tokens evaluated by Ollama', ['api', 'model']
+)
+ollama_eval_tokens = registry.counter(
+    'insightmap_ollama_eval_tokens_total', 'Tokens generated by Ollama', ['api', 'model']
+)
+ollama_tokens_per_second = registry.histogram(
+    'insightmap_ollama_eval_tokens_per_second', 'Decode speed per generation', ['api', 'model', 'endpoint'],
+    buckets=(1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 200)
+)
+ollama_errors = registry.counter(
+    'insightmap_ollama_errors_total', 'Failed Ollama calls by error type', ['model', 'error']
+)
+
+# Our own processing
+queue_wait = registry.histogram(
+    'insightmap_llm_queue_wait_seconds', 'Time spent waiting for an LLM slot'
+)
+postprocess_duration = registry.histogram(
+    'insightmap_analysis_postprocess_seconds', 'Time spent parsing, validating and post-processing LLM output',
+    ['model', 'endpoint']
+)
+llm_truncations = registry.counter(
+    'insightmap_llm_truncations_total', 'Generations whose prompt exceeded num_ctx or whose output hit num_predict',
+    ['model', 'part']
+)
+pdf_page_extract_duration = registry.histogram(
+    'insightmap_pdf_page_extract_seconds', 'Time spent extracting the text of one PDF page',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+json_parse_failures = registry.counter(
+    'insightmap_json_parse_failures_total', 'LLM responses that could not be parsed as JSON', ['model']
+)
+json_repairs = registry.counter(
+    'insightmap_json_repairs_total', 'LLM responses that parsed only after JSON repair', ['model']
+)
+
+_NANOSECONDS = 1e9
+
+# API endpoint or job kind the current thread works for, as the endpoint label
+# of LLM metrics. Threads working for a request run in a copy of its context.
+_current_endpoint = contextvars.ContextVar('metrics_endpoint', default='other')
+
+
+def set_endpoint(endpoint: str) -> None:
+    """Label the LLM metrics of the current request (call when it starts)"""
+    _current_endpoint.set(endpoint or 'other')
+
+
+@contextmanager
+def endpoint_scope(endpoint: str):
+    """Label the LLM metrics recorded inside the block"""
+    token = _current_endpoint.set(endpoint)
+    try:
+        yield
+    finally:
+        _current_endpoint.reset(token)
+
+
+def current_endpoint() -> str:
+    return _current_endpoint.get()
+
+
+def record_ollama_timings(result: Dict, api: str, model: str) -> None:
+    """Record the timing fields Ollama returns with a completed generation"""
+    if not isinstance(result, dict):
+        return
+    labels = {'api': api, 'model': model, 'endpoint': _current_endpoint.get()}
+    if 'total_duration' in result:
+        ollama_total_duration.observe(result['total_duration'] / _NANOSECONDS, **labels)
+    if 'load_duration' in result:
+        ollama_load_duration.observe(result['load_duration'] / _NANOSECONDS, **labels)
+    if 'prompt_eval_duration' in result:
+        ollama_prompt_eval_duration.observe(result['prompt_eval_duration'] / _NANOSECONDS, **labels)
+    if 'prompt_eval_count' in result:
+        ollama_prompt_tokens.inc(result['prompt_eval_count'], api=api, model=model)
+    if 'eval_count' in result:
+        ollama_eval_tokens.inc(result['eval_count'], api=api, model=model)
+    if 'eval_duration' in result:
+        ollama_eval_duration.observe(result['eval_duration'] / _NANOSECONDS, **labels)
+        if result.get('eval_count') and result['eval_duration'] > 0:
+            ollama_tokens_per_second.observe(
+                result['eval_count'] / (result['eval_duration'] / _NANOSECONDS), **labels
+            )
@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+
+from services.ollama_client import OllamaBackend, OllamaClient, get_ollama_client, model_matches
+from services.token_estimator import ContextSizer
+
+
+class ModelKeeper:
+    """
+    Preloads OLLAMA_MODEL on every Ollama host and keeps it resident.
+
+    Ollama unloads an idle model after its keep_alive period, and the next
+    request then pays the full load time. The keeper loads the model at
+    startup with an empty prompt and, on a background thread, re-sends that
+    request every OLLAMA_KEEPER_INTERVAL seconds. On a resident model this
+    only resets the keep_alive timer; on a host where the model was evicted
+    (checked via /api/ps) it reloads it before user traffic needs it.
+
+    The model is loaded with the context window analyses use (num_ctx,
+    capped at the model's trained context length), as Ollama reloads it for
+    a request with a different one.
+    """
+
+    def __init__(self, client: Optional[OllamaClient] = None):
+        self.client = client or get_ollama_client()
+        self.model = os.getenv('OLLAMA_MODEL', 'llama2')
+        self.keep_alive = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+        self.warmup_enabled = os.getenv('OLLAMA_WARMUP', 'True').lower() == 'true'
+        self.interval = float(os.getenv('OLLAMA_KEEPER_INTERVAL', 240))
+        self.num_ctx = ContextSizer().max_ctx
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._status = {
+            backend.base_url: {'warm': False, 'lastWarmup': None, 'loadSeconds': None, 'error': None}
+            for backend in self.client.backends
+        }
+
+    def keep_alive_value(self):
+        """keep_alive as Ollama expects it: a duration string, or an integer number of seconds"""
+        try:
+            return int(self.keep_alive)
+        except ValueError:
+            return self.keep_alive
+
+    def start(self) -> None:
+        """Warm the model in the background and keep it resident"""
+        if not self.warmup_enabled:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='ollama-model-keeper', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        first_pass = True
+        while True:
+            for backend in self.client.backends:
+                if not self._is_loaded(backend) and not first_pass:
+                    print(f"Model {self.model} was unloaded on {backend.base_url}; reloading")
+                self.warm(backend)
+            first_pass = False
+            if self.interval <= 0:
+                return
+            time.sleep(self.interval)
+
+    def _is_loaded(self, backend: OllamaBackend) -> bool:
+        """Ask /api/ps whether the model is currently in memory on this host"""
+        try:
+            response = backend.get('/api/ps', timeout=(self.client.connect_timeout, 10))
+            if response.status_code != 200:
+                return False
+            loaded = set()
+            for entry in response.json().get('models', []):
+                loaded.update(name for name in (entry.get('name'), entry.get('model')) if name)
+            warm = model_matches(self.model, loaded)
+        except (requests.exceptions.RequestException, ValueError):
+            warm = False
+        with self._lock:
+            self._status[backend.base_url]['warm'] = warm
+        return warm
+
+    def warm(self, backend: OllamaBackend) -> bool:
+        """Load the model on one host with an empty generate request"""
+        started = time.time()
+        window = self.client.context_window(backend, self.model)
+        num_ctx = min(self.num_ctx, window) if window else self.num_ctx
+        try:
+            response = backend.post(
+                '/api/generate',
+                {
+                    'model': self.model,
+                    'prompt': '',
+                    'stream': False,
+                    'keep_alive': self.keep_alive_value(),
+                    'options': {'num_ctx': num_ctx}
+                }
+            )
+            if response.status_code != 200:
+                raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
+            load_seconds = round(time.time() - started, 2)
+            print(f"Model {self.model} warmed up on {backend.base_url} in {load_seconds}s")
+            with self._lock:
+                self._status[backend.base_url].update({
+                    'warm': True,
+                    'lastWarmup': time.time(),
+                    'loadSeconds': load_seconds,
+                    'error': None
+                })
+            return True
+        except Exception as e:
+            print(f"Warning: Could not warm up model {self.model} on {backend.base_url}: {e}")
+            with self._lock:
+                self._status[backend.base_url].update({'warm': False, 'error': str(e)})
+            return False
+
+    def mark_used(self, backend: OllamaBackend) -> None:
+        """A successful generation means the model is resident on this host"""
+        with self._lock:
+            if backend.base_url in self._status:
+                self._status[backend.base_url]['warm'] = True
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            backends = {url: dict(status) for url, status in self._status.items()}
+        return {
+            'name': self.model,
+            'warm': any(status['warm'] for status in backends.values()),
+            'keepAlive': self.keep_alive,
+            'numCtx': self.num_ctx,
+            'backends': backends,
+        }
+
+
+_keeper_instance = None
+_keeper_lock = threading.Lock()
+
+
+def get_model_keeper() -> ModelKeeper:
+    """Return the process-wide model keeper"""
+    global _keeper_instance
+    with _keeper_lock:
+        if _keeper_instance is None:
+            _keeper_instance = ModelKeeper()
+        return _keeper_instance
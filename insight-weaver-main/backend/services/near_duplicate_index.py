@@ -0,0 +1,253 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.analysis_cache import DEFAULT_CACHE_DIR
+
+# MinHash signature length (one-permutation hashing: one bin per slot)
+NUM_HASHES = 128
+# LSH banding: documents sharing all rows of any band become candidates.
+# 16 bands of 8 rows put the candidate threshold near a similarity of 0.7.
+LSH_BANDS = 16
+LSH_ROWS = NUM_HASHES // LSH_BANDS
+
+# Word shingle length; long enough that reordered slides or a new header
+# only change the shingles around the edit
+SHINGLE_WORDS = 5
+# Shorter inputs give too few shingles for a meaningful estimate
+MIN_SHINGLES = 32
+
+_BIN_MASK = NUM_HASHES - 1
+_VALUE_SHIFT = 8
+_EMPTY = 1 << 64
+_WORD_RE = re.compile(r'\w+')
+
+
+def minhash_signature(content: str) -> Optional[array]:
+    """
+    MinHash signature over the word shingles of the content.
+
+    Uses one-permutation hashing: every shingle is hashed once and keeps the
+    minimum per bin, which costs one hash per shingle instead of one per
+    shingle and slot. Empty bins are filled from the next non-empty bin
+    (rotation densification). Returns None for content with fewer than
+    MIN_SHINGLES shingles.
+    """
+    words = _WORD_RE.findall(unicodedata.normalize('NFC', content or '').lower())
+    shingle_count = len(words) - SHINGLE_WORDS + 1
+    if shingle_count < MIN_SHINGLES:
+        return None
+
+    bins = [_EMPTY] * NUM_HASHES
+    seen = set()
+    for start in range(shingle_count):
+        shingle = ' '.join(words[start:start + SHINGLE_WORDS])
+        if shingle in seen:
+            continue
+        seen.add(shingle)
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+        slot = value & _BIN_MASK
+        value >>= _VALUE_SHIFT
+        if value < bins[slot]:
+            bins[slot] = value
+
+    for slot in range(NUM_HASHES):
+        if bins[slot] == _EMPTY:
+            for offset in range(1, NUM_HASHES):
+                donor = bins[(slot + offset) % NUM_HASHES]
+                if donor < (1 << 56):
+                    bins[slot] = donor + (offset << 56)
+                    break
+    return array('Q', bins)
+
+
+def estimate_similarity(first: array, second: array) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_HASHES
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of analyzed inputs, mapping each to its analysis cache key.
+
+    Lets a re-exported slide deck or a transcript with a different header
+    reuse the stored analysis of a near-identical earlier input. Signatures
+    are kept in SQLite next to the analysis cache and loaded into in-memory
+    LSH buckets at startup; the index holds at most max_entries documents
+    and forgets the least recently used beyond that.
+
+    Entries are grouped by scope (the cache key material other than the
+    content), so a match always comes from the same model, prompt version
+    and options.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, threshold: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        cache_dir = os.getenv('ANALYSIS_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.db_path = db_path or os.path.join(cache_dir, 'near_duplicates.sqlite3')
+        self.threshold = threshold if threshold is not None else float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.85))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('NEAR_DUPLICATE_MAX_ENTRIES', 20000))
+
+        self._docs = OrderedDict()  # cache key -> (scope, signature), least recently used first
+        self._buckets: List[Dict[int, set]] = [{} for _ in range(LSH_BANDS)]
+        self._lock = threading.Lock()
+        self._stats = {
+            'lookups': 0,
+            'hits': 0,
+            'additions': 0,
+            'evictions': 0,
+            'lookup_seconds': 0.0,
+        }
+
+        self._disk_enabled = True
+        try:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    """CREATE TABLE IF NOT EXISTS near_duplicates (
+                        key TEXT PRIMARY KEY,
+                        scope TEXT NOT NULL,
+                        signature BLOB NOT NULL,
+                        last_access REAL NOT NULL
+                    )"""
+                )
+                rows = conn.execute(
+                    "SELECT key, scope, signature FROM near_duplicates ORDER BY last_access DESC LIMIT ?",
+                    (self.max_entries,)
+                ).fetchall()
+            for key, scope, blob in reversed(rows):
+                signature = array('Q')
+                signature.frombytes(blob)
+                if len(signature) == NUM_HASHES:
+                    self._insert(key, scope, signature)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: On-disk near-duplicate index disabled ({e}). Using in-memory index only.")
+            self._disk_enabled = False
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    @staticmethod
+    def _band_keys(scope: str, signature: array) -> List[int]:
+        return [hash((scope, band) + tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]))
+                for band in range(LSH_BANDS)]
+
+    def _insert(self, key: str, scope: str, signature: array) -> None:
+        """Add a document to the in-memory index (caller holds the lock or is __init__)"""
+        self._docs[key] = (scope, signature)
+        self._docs.move_to_end(key)
+        for band, band_key in enumerate(self._band_keys(scope, signature)):
+            self._buckets[band].setdefault(band_key, set()).add(key)
+
+    def _forget(self, key: str) -> bool:
+        """Drop a document from the in-memory index (caller holds the lock)"""
+        entry = self._docs.pop(key, None)
+        if entry is None:
+            return False
+        for band, band_key in enumerate(self._band_keys(*entry)):
+            bucket = self._buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][band_key]
+        return True
+
+    def find(self, signature: Optional[array], scope: str) -> Optional[Tuple[str, float]]:
+        """
+        Most similar indexed document in the same scope.
+
+        Returns (cache key, estimated similarity) if the similarity reaches
+        the threshold, otherwise None.
+        """
+        if signature is None:
+            return None
+        started = time.perf_counter()
+        best = None
+        with self._lock:
+            candidates = set()
+            for band, band_key in enumerate(self._band_keys(scope, signature)):
+                bucket = self._buckets[band].get(band_key)
+                if bucket:
+                    candidates.update(bucket)
+            for key in candidates:
+                candidate_scope, candidate_signature = self._docs[key]
+                if candidate_scope != scope:
+                    continue
+                similarity = estimate_similarity(signature, candidate_signature)
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (key, similarity)
+            if best is not None:
+                self._docs.move_to_end(best[0])
+                self._stats['hits'] += 1
+            self._stats['lookups'] += 1
+            self._stats['lookup_seconds'] += time.perf_counter() - started
+        return best
+
+    def add(self, key: str, scope: str, signature: Optional[array]) -> None:
+        """Index the input behind a cache key"""
+        if signature is None:
+            return
+        now = time.time()
+        evicted = []
+        with self._lock:
+            self._forget(key)
+            self._insert(key, scope, signature)
+            self._stats['additions'] += 1
+            while len(self._docs) > self.max_entries:
+                oldest = next(iter(self._docs))
+                self._forget(oldest)
+                evicted.append(oldest)
+            self._stats['evictions'] += len(evicted)
+
+        if self._disk_enabled:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO near_duplicates (key, scope, signature, last_access) VALUES (?, ?, ?, ?)",
+                        (key, scope, signature.tobytes(), now)
+                    )
+                    conn.executemany("DELETE FROM near_duplicates WHERE key = ?", [(k,) for k in evicted])
+            except sqlite3.Error as e:
+                print(f"Warning: Near-duplicate index write failed: {e}")
+
+    def remove(self, key: str) -> None:
+        """Forget a document, e.g. after its cached analysis expired"""
+        with self._lock:
+            self._forget(key)
+        if self._disk_enabled:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM near_duplicates WHERE key = ?", (key,))
+            except sqlite3.Error as e:
+                print(f"Warning: Near-duplicate index write failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._docs)
+        lookup_seconds = stats.pop('lookup_seconds')
+        stats['avg_lookup_ms'] = round(lookup_seconds * 1000 / stats['lookups'], 4) if stats['lookups'] else 0.0
+        stats['threshold'] = self.threshold
+        stats['max_entries'] = self.max_entries
+        stats['disk_enabled'] = self._disk_enabled
+        return stats
+
+
+_index_instance = None
+_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index() -> NearDuplicateIndex:
+    """Return the process-wide near-duplicate index"""
+    global _index_instance
+    with _index_lock:
+        if _index_instance is None:
+            _index_instance = NearDuplicateIndex()
+        return _index_instance
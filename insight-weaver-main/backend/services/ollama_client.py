@@ -0,0 +1,303 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.circuit_breaker import CircuitBreaker
+
+
+class OllamaAPIError(Exception):
+    """Ollama answered with a non-success HTTP status"""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"Ollama API error: {status_code} - {text}")
+        self.status_code = status_code
+
+
+def model_matches(model: str, available: Set[str]) -> bool:
+    """Ollama lists models as name:tag; an untagged name means :latest"""
+    if model in available:
+        return True
+    if ':' not in model:
+        return f"{model}:latest" in available
+    return False
+
+
+class OllamaBackend:
+    """One Ollama host plus its routing state"""
+
+    def __init__(self, client: 'OllamaClient', base_url: str):
+        self.client = client
+        self.base_url = base_url.rstrip('/')
+        self.outstanding = 0
+        self.healthy = True
+        self.models = None  # None until the first health probe; then the set of pulled models
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.last_error = None
+        # When the server last rejected a JSON schema as "format" (Ollama before 0.5)
+        self._schema_rejected_at = None
+        # model -> (trained context length or None, checked at), from /api/show
+        self.context_windows = {}
+
+        # Which text API the server supports ('chat' or 'generate'), detected on first use
+        self._api_mode = None
+        self._api_mode_checked_at = 0.0
+
+    def get_api_mode(self) -> Optional[str]:
+        """
+        Return the detected API mode, or None if it is unknown or due for re-validation.
+
+        A stale 'generate' mode returns None so the next request tries the chat
+        API again (e.g. after Ollama was upgraded).
+        """
+        with self.client._lock:
+            if self._api_mode is None:
+                return None
+            if time.time() - self._api_mode_checked_at > self.client.capability_ttl:
+                return None
+            return self._api_mode
+
+    def supports_schema_format(self) -> bool:
+        """Whether to send JSON schemas as "format"; a rejection is re-validated like the API mode"""
+        with self.client._lock:
+            return (self._schema_rejected_at is None
+                    or time.time() - self._schema_rejected_at > self.client.capability_ttl)
+
+    def reject_schema_format(self) -> None:
+        """Record that the server answered a JSON schema "format" with a format error"""
+        with self.client._lock:
+            if self._schema_rejected_at is None:
+                print(f"Warning: Ollama at {self.base_url} rejected a JSON schema format; using format=json")
+            self._schema_rejected_at = time.time()
+
+    def set_api_mode(self, mode: str) -> None:
+        """Record which API the server supports ('chat' or 'generate')"""
+        with self.client._lock:
+            if mode != self._api_mode:
+                print(f"Ollama API mode detected for {self.base_url}: {mode}")
+            self._api_mode = mode
+            self._api_mode_checked_at = time.time()
+
+    def post(self, path: str, payload: Dict[str, Any], stream: bool = False,
+             timeout: Optional[Tuple[float, float]] = None) -> requests.Response:
+        """POST a JSON payload to an Ollama API path such as /api/chat"""
+        response = self.client.session.post(
+            f"{self.base_url}{path}",
+            json=payload,
+            stream=stream,
+            timeout=timeout or self.client.timeout
+        )
+        if response.status_code >= 500:
+            self.client._record_failure(self, f"HTTP {response.status_code}")
+        return response
+
+    def get(self, path: str, timeout: Optional[Tuple[float, float]] = None) -> requests.Response:
+        """GET an Ollama API path such as /api/tags"""
+        return self.client.session.get(f"{self.base_url}{path}", timeout=timeout or self.client.timeout)
+
+    def is_available(self, model: Optional[str], now: float) -> bool:
+        if not self.healthy or self.ejected_until > now:
+            return False
+        return model is None or self.models is None or model_matches(model, self.models)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'url': self.base_url,
+            'healthy': self.healthy,
+            'ejected': self.ejected_until > time.time(),
+            'outstanding': self.outstanding,
+            'consecutiveFailures': self.consecutive_failures,
+            'models': sorted(self.models) if self.models is not None else None,
+            'apiMode': self._api_mode,
+            'lastError': self.last_error,
+        }
+
+
+class OllamaClient:
+    """
+    Process-wide HTTP client for one or more Ollama hosts.
+
+    OLLAMA_API_URL may list several comma-separated hosts. Each request is
+    routed to the host with the fewest outstanding requests among those that
+    passed their last health probe (GET /api/tags), have the requested model
+    pulled and are not temporarily ejected after repeated errors. All hosts
+    share one pooled, keep-alive session.
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
+        urls = [url.strip() for url in (base_url or os.getenv('OLLAMA_API_URL', 'http://localhost:11434')).split(',')]
+        urls = [url for url in urls if url] or ['http://localhost:11434']
+        self.model = os.getenv('OLLAMA_MODEL', 'llama2')
+        self.pool_size = max(1, int(os.getenv('OLLAMA_POOL_SIZE', 10)))
+        self.keep_alive = os.getenv('OLLAMA_HTTP_KEEPALIVE', 'True').lower() == 'true'
+        self.connect_timeout = float(os.getenv('OLLAMA_CONNECT_TIMEOUT', 5))
+        self.read_timeout = float(os.getenv('OLLAMA_READ_TIMEOUT', 120))
+        self.capability_ttl = float(os.getenv('OLLAMA_CAPABILITY_TTL', 600))
+        self.health_interval = float(os.getenv('OLLAMA_HEALTH_INTERVAL', 15))
+        self.eject_after = max(1, int(os.getenv('OLLAMA_EJECT_AFTER', 3)))
+        self.eject_seconds = float(os.getenv('OLLAMA_EJECT_SECONDS', 30))
+
+        self._lock = threading.Lock()
+        self.breaker = CircuitBreaker()
+        self.backends = [OllamaBackend(self, url) for url in urls]
+        self.base_url = ', '.join(backend.base_url for backend in self.backends)
+
+        # urllib3 pools are thread-safe; pool_block makes threads wait for a free
+        # connection instead of opening throwaway sockets beyond pool_size.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max(4, len(urls)), pool_maxsize=self.pool_size, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if not self.keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+        self._health_thread = None
+        if self.health_interval > 0:
+            self._health_thread = threading.Thread(target=self._health_loop, name='ollama-health', daemon=True)
+            self._health_thread.start()
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """(connect, read) timeout tuple passed to requests"""
+        return (self.connect_timeout, self.read_timeout)
+
+    @contextmanager
+    def lease(self, model: Optional[str] = None):
+        """
+        Pick a backend for one request and count it as outstanding until the block exits.
+
+        Connection errors and timeouts inside the block count towards ejecting
+        the backend; a clean exit resets its failure count.
+        """
+        backend = self._choose(model or self.model)
+        failures_before = backend.consecutive_failures
+        try:
+            yield backend
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            self._record_failure(backend, str(e))
+            raise
+        else:
+            with self._lock:
+                if backend.consecutive_failures == failures_before:
+                    backend.consecutive_failures = 0
+        finally:
+            with self._lock:
+                backend.outstanding -= 1
+
+    def _choose(self, model: str) -> OllamaBackend:
+        now = time.time()
+        with self._lock:
+            candidates = [backend for backend in self.backends if backend.is_available(model, now)]
+            if not candidates:
+                # Nothing looks healthy; fall back to hosts that are at least not ejected
+                candidates = [backend for backend in self.backends if backend.ejected_until <= now]
+            if not candidates:
+                raise requests.exceptions.ConnectionError(
+                    f"No healthy Ollama backend available for model {model} (tried {self.base_url})"
+                )
+            fewest = min(backend.outstanding for backend in candidates)
+            backend = random.choice([b for b in candidates if b.outstanding == fewest])
+            backend.outstanding += 1
+            return backend
+
+    def _record_failure(self, backend: OllamaBackend, error: str) -> None:
+        with self._lock:
+            backend.consecutive_failures += 1
+            backend.last_error = error
+            if backend.consecutive_failures >= self.eject_after and len(self.backends) > 1:
+                backend.ejected_until = time.time() + self.eject_seconds
+                print(f"Warning: Ejecting Ollama backend {backend.base_url} for {self.eject_seconds:.0f}s: {error}")
+
+    def probe(self, backend: OllamaBackend) -> None:
+        """
+        Actively check one backend via /api/tags and record its pulled models.
+
+        Answering /api/tags says nothing about generations, so a probe never
+        ends an ejection or clears the failure count; only a successful
+        generation (or the ejection expiring) does.
+        """
+        try:
+            response = backend.get('/api/tags', timeout=(self.connect_timeout, 10))
+            response.raise_for_status()
+            models = set()
+            for entry in response.json().get('models', []):
+                models.update(name for name in (entry.get('name'), entry.get('model')) if name)
+            with self._lock:
+                if not backend.healthy:
+                    print(f"Ollama backend {backend.base_url} is healthy again")
+                    backend.last_error = None
+                backend.healthy = True
+                backend.models = models
+        except (requests.exceptions.RequestException, ValueError) as e:
+            with self._lock:
+                if backend.healthy:
+                    print(f"Warning: Ollama backend {backend.base_url} failed health check: {e}")
+                backend.healthy = False
+                backend.last_error = str(e)
+
+    def context_window(self, backend: OllamaBackend, model: str) -> Optional[int]:
+        """
+        Context length a model was trained on, as a backend reports it in /api/show.
+
+        Cached per backend and model for OLLAMA_CAPABILITY_TTL seconds;
+        None when the server doesn't report it.
+        """
+        now = time.time()
+        with self._lock:
+            cached = backend.context_windows.get(model)
+            if cached is not None and now - cached[1] <= self.capability_ttl:
+                return cached[0]
+
+        window = None
+        try:
+            # Older servers read "name", newer ones "model"
+            response = backend.post('/api/show', {'model': model, 'name': model}, timeout=(self.connect_timeout, 10))
+            if response.status_code == 200:
+                model_info = response.json().get('model_info') or {}
+                window = next((int(value) for key, value in model_info.items()
+                               if key.endswith('.context_length')), None)
+        except (requests.exceptions.RequestException, ValueError, TypeError) as e:
+            print(f"Warning: Could not read the context length of {model} from {backend.base_url}: {e}")
+
+        with self._lock:
+            backend.context_windows[model] = (window, now)
+        return window
+
+    def _health_loop(self) -> None:
+        while True:
+            for backend in self.backends:
+                self.probe(backend)
+            time.sleep(self.health_interval)
+
+    def post(self, path: str, payload: Dict[str, Any], stream: bool = False,
+             timeout: Optional[Tuple[float, float]] = None) -> requests.Response:
+        """POST to a routed backend (use lease() directly to keep a streamed response's slot)"""
+        with self.lease(payload.get('model')) as backend:
+            return backend.post(path, payload, stream=stream, timeout=timeout)
+
+    def get_status(self) -> List[Dict[str, Any]]:
+        """Routing state of every configured host"""
+        with self._lock:
+            return [backend.get_status() for backend in self.backends]
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client_instance = None
+_client_lock = threading.Lock()
+
+
+def get_ollama_client() -> OllamaClient:
+    """Return the process-wide Ollama client shared by all blueprints"""
+    global _client_instance
+    with _client_lock:
+        if _client_instance is None:
+            _client_instance = OllamaClient()
+        return _client_instance
@@ -1,41 +1,425 @@
 import PyPDF2
-from io import BytesIO
-from typing import Optional
+import hashlib
+import mmap
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from services import metrics
+from services.pdf_prescan import PDF_IMAGE_ONLY, prescan_pdf
+from services.pdf_text_cache import get_pdf_text_cache
+
+# Separator between the texts of consecutive pages in extracted content
+PAGE_SEPARATOR = "\n\n"
+
+_DOCUMENT_ID = re.compile(r'[0-9a-f]{64}')
+
+
+class PDFDocumentNotFoundError(Exception):
+    """A documentId that is unknown, or whose PDF is no longer stored"""
+
+
+def _extract_page(pdf_reader: PyPDF2.PdfReader, page_num: int) -> Tuple[str, float]:
+    """Text of one page and the seconds it took; unreadable pages yield empty text"""
+    started = time.perf_counter()
+    try:
+        page_text = pdf_reader.pages[page_num].extract_text() or ''
+    except Exception as e:
+        print(f"Warning: Could not extract text from page {page_num + 1}: {e}")
+        page_text = ''
+    return page_text, time.perf_counter() - started
+
+
+@contextmanager
+def open_pdf(pdf_path: str):
+    """
+    PdfReader over a memory map of the file.
+
+    PdfReader(path) reads the whole file into a bytes buffer; a memory map
+    lets the OS page the file in and out instead.
+    """
+    with open(pdf_path, 'rb') as pdf_file:
+        if os.fstat(pdf_file.fileno()).st_size == 0:
+            raise PyPDF2.errors.EmptyFileError('Cannot read an empty file')
+        with mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield PyPDF2.PdfReader(mapped)
+
+
+def _extract_page_range(pdf_path: str, page_nums: List[int]) -> List[Tuple[str, float]]:
+    """Process pool task: open the PDF from disk and extract the given pages"""
+    with open_pdf(pdf_path) as pdf_reader:
+        return [_extract_page(pdf_reader, page_num) for page_num in page_nums]
+
+
+def parse_page_ranges(spec: Optional[str], page_count: int) -> List[int]:
+    """
+    Turn a page range spec like "1-5,8,10-" (1-based, inclusive, "10-" runs
+    to the last page) into sorted 0-based page numbers. An empty spec
+    selects every page; pages past the end are ignored, but a spec that
+    selects no page at all is an error.
+    """
+    if not spec or not spec.strip():
+        return list(range(page_count))
+
+    selected = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, dash, last = part.partition('-')
+        try:
+            start = int(first)
+            # An open range starting past the end selects nothing rather than being malformed
+            stop = int(last) if last.strip() else (max(page_count, start) if dash else start)
+        except ValueError:
+            raise ValueError(f'Invalid page range: {part!r}')
+        if start < 1 or stop < start:
+            raise ValueError(f'Invalid page range: {part!r}')
+        selected.update(range(start - 1, min(stop, page_count)))
+    if not selected:
+        raise ValueError(f'No pages in range {spec!r}; the document has {page_count} pages')
+    return sorted(selected)
+
+
+# Workers are forked: spawned ones would re-import the app's main module
+# (python app.py) and start its job workers and warm-up in every worker
+FORK_AVAILABLE = 'fork' in multiprocessing.get_all_start_methods()
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def extract_workers() -> int:
+    """PDF_EXTRACT_WORKERS, or 1 where processes cannot be forked (Windows)"""
+    workers = int(os.getenv('PDF_EXTRACT_WORKERS', min(4, os.cpu_count() or 1)))
+    return workers if FORK_AVAILABLE else 1
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    This process's page extraction pool, started on first use.
+
+    Pools are per process: a pool inherited through fork (gunicorn --preload,
+    uWSGI without lazy-apps) shares the parent's pipes and has no manager
+    thread, so a process that did not create the pool starts its own.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool; the next long extraction starts a new one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
 
 class PDFExtractService:
     """Service for extracting text content from PDF files"""
-    
+
+    def __init__(self):
+        self.workers = extract_workers()
+        if not FORK_AVAILABLE and int(os.getenv('PDF_EXTRACT_WORKERS', 2)) > 1:
+            print("Warning: Processes cannot be forked on this platform; PDF pages will be extracted serially")
+        self.parallel_min_pages = int(os.getenv('PDF_EXTRACT_PARALLEL_MIN_PAGES', 24))
+        self.prescan_pages = int(os.getenv('PDF_PRESCAN_PAGES', 8))
+        cache_enabled = os.getenv('PDF_CACHE_ENABLED', 'True').lower() == 'true'
+        self.cache = get_pdf_text_cache() if cache_enabled else None
+
     def extract_text(self, pdf_file) -> str:
         """
         Extract text content from PDF file.
-        
+
         Args:
-            pdf_file: File object from Flask request
-            
+            pdf_file: File object from Flask request, or a path to a PDF file
+
         Returns:
             Extracted text content as string
         """
+        text_content = self.extract_range(pdf_file)['content']
+        if not text_content:
+            raise Exception("Failed to extract text from PDF: No text content found in PDF. "
+                            "The PDF might contain only images.")
+        return text_content
+
+    def extract_range(self, pdf_file=None, document_id: Optional[str] = None, pages: Optional[str] = None,
+                      max_chars: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Extract the text of some or all pages of a PDF, with a page index.
+
+        Pass either an uploaded pdf_file (file object or path) or the
+        documentId (SHA-256) of a PDF uploaded before. pages is a range spec
+        for parse_page_ranges (default: every page). With max_chars, pages
+        are added in order until the next one would exceed the budget; the
+        first requested page is always returned.
+
+        Only the returned pages are extracted. Page texts are cached under
+        the documentId, and the PDF is kept while some of its pages have not
+        been extracted, so later ranges need no re-upload.
+
+        Returns documentId, pageCount, content, pages ([{page, start, end}]
+        character spans in content, 1-based page numbers), truncated,
+        nextPage (first requested page not returned, or None) and
+        extraction stats.
+
+        Raises ValueError for an invalid range, PDFDocumentNotFoundError for
+        an unknown documentId and Exception for unreadable or image-only
+        PDFs.
+        """
+        if pdf_file is None:
+            if not _DOCUMENT_ID.fullmatch(document_id or ''):
+                raise PDFDocumentNotFoundError(f'Unknown document: {document_id}')
+            pdf_path = self.cache.file_path(document_id) if self.cache is not None else None
+            return self._extract_range(document_id, pdf_path, False, pages, max_chars)
+
+        document_id = self._digest(pdf_file)
+        pdf_path, temp_path = self._source_path(pdf_file)
+        try:
+            return self._extract_range(document_id, pdf_path, True, pages, max_chars)
+        finally:
+            if temp_path is not None:
+                os.unlink(temp_path)
+
+    def _extract_range(self, document_id: str, pdf_path: Optional[str], uploaded: bool, pages: Optional[str],
+                       max_chars: Optional[int]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        page_texts = self.cache.get(document_id) if self.cache is not None else None
+        if page_texts is None and not uploaded:
+            raise PDFDocumentNotFoundError(f'Unknown document: {document_id}')
+
         try:
-            # Read PDF file
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            # Extract text from all pages
-            text_content = ""
-            for page_num, page in enumerate(pdf_reader.pages):
-                try:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_content += page_text + "\n\n"
-                except Exception as e:
-                    print(f"Warning: Could not extract text from page {page_num + 1}: {e}")
-                    continue
-            
-            if not text_content.strip():
-                raise Exception("No text content found in PDF. The PDF might contain only images.")
-            
-            return text_content.strip()
-            
+            with self._reader(pdf_path, needed=page_texts is None) as pdf_reader:
+                prescan = None
+                if page_texts is None:
+                    prescan = self._prescan(pdf_reader)
+                    text_pages = set(prescan['textPages'])
+                    # None marks a page whose text has not been extracted yet
+                    page_texts = [None if page_num in text_pages else '' for page_num in range(len(pdf_reader.pages))]
+
+                requested = parse_page_ranges(pages, len(page_texts))
+                selected, timings, workers, truncated = self._collect(
+                    document_id, pdf_path, pdf_reader, page_texts, requested, max_chars
+                )
+        except (ValueError, PDFDocumentNotFoundError):
+            raise
         except PyPDF2.errors.PdfReadError as e:
             raise Exception(f"Invalid or corrupted PDF file: {str(e)}")
         except Exception as e:
             raise Exception(f"Failed to extract text from PDF: {str(e)}")
+
+        if self.cache is not None and (timings or prescan is not None):
+            if uploaded and None in page_texts:
+                self.cache.store_file(document_id, pdf_path)
+            self.cache.set(document_id, page_texts)
+
+        content, index = self._build_content(page_texts, selected)
+        extraction = {
+            'workers': workers,
+            'cached': not timings,
+            'durationMs': round((time.perf_counter() - started) * 1000, 1),
+            'extractedPages': [page_num + 1 for page_num in timings],
+            'pageTimingsMs': [round(seconds * 1000, 2) for seconds in timings.values()],
+        }
+        if prescan is not None:
+            extraction['classification'] = prescan['classification']
+            extraction['skippedPages'] = len(page_texts) - len(prescan['textPages'])
+
+        return {
+            'documentId': document_id,
+            'pageCount': len(page_texts),
+            'content': content,
+            'pages': index,
+            'truncated': truncated,
+            'nextPage': requested[len(selected)] + 1 if len(selected) < len(requested) else None,
+            'extraction': extraction,
+        }
+
+    def _collect(self, document_id: str, pdf_path: Optional[str], pdf_reader: Optional[PyPDF2.PdfReader],
+                 page_texts: List[Optional[str]], requested: List[int],
+                 max_chars: Optional[int]) -> Tuple[List[int], Dict[int, float], int, bool]:
+        """
+        Pick the requested pages that fit into max_chars, extracting those not yet known.
+
+        Fills page_texts in place. Returns (selected page numbers, seconds
+        per newly extracted page, workers used, whether the budget cut the
+        range short). With a budget, pages are extracted in batches (single
+        pages without a pool) so that pages beyond it are not extracted at all.
+        """
+        if not max_chars:
+            batch_size = max(1, len(requested))
+        else:
+            batch_size = max(1, self.parallel_min_pages) if self.workers > 1 else 1
+        selected, timings, workers = [], {}, 0
+        length = 0
+        for offset in range(0, len(requested), batch_size):
+            batch = requested[offset:offset + batch_size]
+            pending = [page_num for page_num in batch if page_texts[page_num] is None]
+            if pending and (pdf_path is None or not os.path.exists(pdf_path)):
+                # Another request may have extracted the remaining pages and dropped the stored PDF
+                self._refresh(document_id, page_texts)
+                pending = [page_num for page_num in batch if page_texts[page_num] is None]
+            if pending:
+                if pdf_path is None or not os.path.exists(pdf_path):
+                    raise PDFDocumentNotFoundError('The PDF is no longer stored; upload it again')
+                results, used = self._extract_pages(pdf_path, pdf_reader, pending)
+                workers = max(workers, used)
+                for page_num, (page_text, seconds) in zip(pending, results):
+                    page_texts[page_num] = page_text
+                    timings[page_num] = seconds
+                    metrics.pdf_page_extract_duration.observe(seconds)
+
+            for page_num in batch:
+                page_text = page_texts[page_num].strip()
+                added = len(page_text) + (len(PAGE_SEPARATOR) if length and page_text else 0)
+                if max_chars and selected and length + added > max_chars:
+                    return selected, timings, workers, True
+                selected.append(page_num)
+                length += added
+        return selected, timings, workers, False
+
+    def _refresh(self, document_id: str, page_texts: List[Optional[str]]) -> None:
+        """Fill pages not extracted yet from the cache, in place"""
+        latest = self.cache.get(document_id) if self.cache is not None else None
+        if latest is not None and len(latest) == len(page_texts):
+            for page_num, page_text in enumerate(latest):
+                if page_texts[page_num] is None:
+                    page_texts[page_num] = page_text
+
+    @staticmethod
+    def _build_content(page_texts: List[Optional[str]], selected: List[int]) -> Tuple[str, List[Dict[str, int]]]:
+        """Join the selected pages in one pass and record each page's character span"""
+        parts, index = [], []
+        length = 0
+        for page_num in selected:
+            page_text = page_texts[page_num].strip()
+            if page_text and parts:
+                parts.append(PAGE_SEPARATOR)
+                length += len(PAGE_SEPARATOR)
+            start = length
+            if page_text:
+                parts.append(page_text)
+                length += len(page_text)
+            index.append({'page': page_num + 1, 'start': start, 'end': length})
+        return ''.join(parts), index
+
+    @staticmethod
+    def _digest(pdf_file) -> str:
+        """SHA-256 of the PDF; uploads spooled by UploadSpool already have it"""
+        stream = getattr(pdf_file, 'stream', pdf_file)
+        digest = getattr(stream, 'digest', None)
+        if isinstance(digest, str):
+            return digest
+
+        sha256 = hashlib.sha256()
+        if isinstance(pdf_file, (str, os.PathLike)):
+            with open(pdf_file, 'rb') as source:
+                for block in iter(lambda: source.read(1024 * 1024), b''):
+                    sha256.update(block)
+        else:
+            stream.seek(0)
+            for block in iter(lambda: stream.read(1024 * 1024), b''):
+                sha256.update(block)
+            stream.seek(0)
+        return sha256.hexdigest()
+
+    @staticmethod
+    def _source_path(pdf_file) -> Tuple[str, Optional[str]]:
+        """
+        Path of the PDF on disk, for memory mapping and for workers.
+
+        Returns (path, temp path to delete afterwards or None). Uploads
+        spooled to disk are used in place; anything else is copied to a
+        temp file.
+        """
+        if isinstance(pdf_file, (str, os.PathLike)):
+            return os.fspath(pdf_file), None
+
+        stream = getattr(pdf_file, 'stream', pdf_file)
+        if getattr(stream, 'path', None):
+            stream.flush()
+            return stream.path, None
+
+        stream.seek(0)
+        fd, temp_path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as temp_file:
+            shutil.copyfileobj(stream, temp_file, 1024 * 1024)
+        return temp_path, temp_path
+
+    @staticmethod
+    @contextmanager
+    def _reader(pdf_path: Optional[str], needed: bool):
+        """Open the PDF for the pre-scan and serial extraction; None when it isn't needed yet"""
+        if not needed:
+            yield None
+            return
+        with open_pdf(pdf_path) as pdf_reader:
+            yield pdf_reader
+
+    def _is_parallel(self, page_count: int) -> bool:
+        return self.workers > 1 and page_count >= self.parallel_min_pages
+
+    def _prescan(self, pdf_reader: PyPDF2.PdfReader) -> Dict[str, Any]:
+        """Classify the PDF; image-only documents fail here, in milliseconds"""
+        try:
+            prescan = prescan_pdf(pdf_reader, self.prescan_pages)
+        except PyPDF2.errors.PdfReadError:
+            raise
+        except Exception as e:
+            # Unusual structure; let the full extraction decide
+            print(f"Warning: PDF pre-scan failed, extracting every page: {e}")
+            page_count = len(pdf_reader.pages)
+            return {'classification': 'unknown', 'textPages': list(range(page_count)), 'sampledPages': [], 'durationMs': 0}
+
+        if prescan['classification'] == PDF_IMAGE_ONLY:
+            raise Exception("No text content found in PDF. The PDF might contain only images.")
+        return prescan
+
+    def _extract_pages(self, pdf_path: str, pdf_reader: Optional[PyPDF2.PdfReader],
+                       page_nums: List[int]) -> Tuple[List[Tuple[str, float]], int]:
+        """
+        Extract the given pages, in a process pool when there are many.
+
+        Returns ([(page text, seconds)] in the order of page_nums, number of
+        workers used). Each worker opens the PDF from disk and extracts a
+        contiguous run of the pages, so the results only need joining.
+        """
+        if not self._is_parallel(len(page_nums)):
+            return self._extract_serially(pdf_path, pdf_reader, page_nums), 1
+
+        # Two runs of pages per worker evens out pages of very different complexity
+        run_count = min(len(page_nums), self.workers * 2)
+        bounds = [len(page_nums) * index // run_count for index in range(run_count + 1)]
+        pool = _get_pool(self.workers)
+        try:
+            futures = [pool.submit(_extract_page_range, pdf_path, page_nums[start:stop])
+                       for start, stop in zip(bounds, bounds[1:])]
+            page_results = []
+            for future in futures:
+                page_results.extend(future.result())
+        except BrokenProcessPool as e:
+            print(f"Warning: PDF extraction workers died ({e}); extracting these pages serially")
+            _discard_pool(pool)
+            return self._extract_serially(pdf_path, pdf_reader, page_nums), 1
+        return page_results, self.workers
+
+    @staticmethod
+    def _extract_serially(pdf_path: str, pdf_reader: Optional[PyPDF2.PdfReader],
+                          page_nums: List[int]) -> List[Tuple[str, float]]:
+        if pdf_reader is not None:
+            return [_extract_page(pdf_reader, page_num) for page_num in page_nums]
+        return _extract_page_range(pdf_path, page_nums)
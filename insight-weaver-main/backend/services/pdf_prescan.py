@@ -0,0 +1,118 @@
+import re
+import time
+from typing import Any, Dict, List
+
+import PyPDF2
+
+PDF_TEXT = 'text'
+PDF_MIXED = 'mixed'
+PDF_IMAGE_ONLY = 'image-only'
+
+# Text-showing operators (Tj, TJ, ' and ") inside a BT ... ET block
+_TEXT_OBJECT = re.compile(rb'(?:^|\s)BT(?:\s|$)')
+_TEXT_SHOW = re.compile(rb'T[jJ](?:\s|$)|[\'"](?:\s|$)')
+
+# Form XObjects can nest; deeper ones are not worth following
+_MAX_FORM_DEPTH = 3
+
+
+def _resolve(value):
+    return value.get_object() if value is not None else None
+
+
+def _resources_have_fonts(resources, depth: int = 0) -> bool:
+    """Whether a resource dictionary, or a form XObject it uses, declares fonts"""
+    resources = _resolve(resources)
+    if not resources:
+        return False
+    if _resolve(resources.get('/Font')):
+        return True
+    if depth >= _MAX_FORM_DEPTH:
+        return False
+    xobjects = _resolve(resources.get('/XObject')) or {}
+    for xobject in xobjects.values():
+        xobject = _resolve(xobject)
+        if xobject.get('/Subtype') == '/Form' and _resources_have_fonts(xobject.get('/Resources'), depth + 1):
+            return True
+    return False
+
+
+def page_has_fonts(page: PyPDF2.PageObject) -> bool:
+    """
+    Cheap check whether a page can contain extractable text.
+
+    Only looks at the resource dictionaries, without decoding any content
+    stream: a page that declares no fonts cannot show text.
+    """
+    return _resources_have_fonts(page.get('/Resources'))
+
+
+def page_shows_text(page: PyPDF2.PageObject) -> bool:
+    """Whether the page's content stream draws text (or the text is in a form XObject)"""
+    contents = _resolve(page.get('/Contents'))
+    if contents is None:
+        return False
+    streams = contents if isinstance(contents, PyPDF2.generic.ArrayObject) else [contents]
+    for stream in streams:
+        data = _resolve(stream).get_data()
+        if _TEXT_OBJECT.search(data) and _TEXT_SHOW.search(data):
+            return True
+    # Fonts that live only in form XObjects are used by drawing the form
+    resources = _resolve(page.get('/Resources')) or {}
+    return not _resolve(resources.get('/Font')) and page_has_fonts(page)
+
+
+def sample_pages(page_count: int, sample_size: int) -> List[int]:
+    """Up to sample_size page numbers spread evenly over the document, first and last included"""
+    if page_count <= sample_size:
+        return list(range(page_count))
+    if sample_size <= 1:
+        return [0]
+    return sorted({round(index * (page_count - 1) / (sample_size - 1)) for index in range(sample_size)})
+
+
+def prescan_pdf(pdf_reader: PyPDF2.PdfReader, sample_size: int = 8) -> Dict[str, Any]:
+    """
+    Classify a PDF as text-bearing, image-only or mixed before extraction.
+
+    Every page's resources are checked for fonts (no stream decoding), and
+    the content streams of up to sample_size pages with fonts are checked
+    for text-showing operators. Scans, which have no fonts or only unused
+    ones, come out as image-only. When only some sampled pages show text,
+    every page's content stream is checked so that only pages with text
+    are extracted.
+
+    Returns a dict with classification, textPages (page numbers worth
+    extracting), sampledPages and durationMs.
+    """
+    started = time.perf_counter()
+    pages = pdf_reader.pages
+    font_pages = [page_num for page_num, page in enumerate(pages) if page_has_fonts(page)]
+
+    sampled = [font_pages[index] for index in sample_pages(len(font_pages), sample_size)]
+    shows_text = {page_num: page_shows_text(pages[page_num]) for page_num in sampled}
+
+    if all(shows_text.values()):
+        text_pages = font_pages
+    elif any(shows_text.values()):
+        # Text on some pages only: check each page so the scans in between are skipped
+        for page_num in font_pages:
+            if page_num not in shows_text:
+                shows_text[page_num] = page_shows_text(pages[page_num])
+        text_pages = [page_num for page_num in font_pages if shows_text[page_num]]
+    else:
+        text_pages = []
+
+    if not text_pages:
+        classification = PDF_IMAGE_ONLY
+    elif len(text_pages) == len(pages):
+        classification = PDF_TEXT
+    else:
+        classification = PDF_MIXED
+
+    return {
+        'classification': classification,
+        'textPages': text_pages,
+        'sampledPages': sampled,
+        'durationMs': round((time.perf_counter() - started) * 1000, 1),
+    }
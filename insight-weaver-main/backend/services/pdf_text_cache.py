@@ -0,0 +1,205 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+import PyPDF2
+
+from services.analysis_cache import DEFAULT_CACHE_DIR
+
+# Text extracted by another PyPDF2 version may differ; such entries are misses
+EXTRACTOR_VERSION = f'PyPDF2-{PyPDF2.__version__}'
+
+
+class PDFTextCache:
+    """
+    On-disk cache of extracted PDF text, keyed by the SHA-256 of the file.
+
+    Stores the text of every page (zlib-compressed JSON) and the page
+    count in SQLite. Entries never expire since the key is the content
+    itself; the least recently used are evicted beyond the size cap.
+
+    Pages extracted lazily are None until someone asks for them; while an
+    entry has such pages, a copy of the PDF is kept in files_dir and
+    counts towards the size cap.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_disk_bytes: Optional[int] = None):
+        cache_dir = os.getenv('ANALYSIS_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.db_path = db_path or os.path.join(cache_dir, 'pdf_text_cache.sqlite3')
+        self.files_dir = os.path.join(os.path.dirname(self.db_path), 'pdf_files')
+        self.max_disk_bytes = max_disk_bytes if max_disk_bytes is not None else int(float(os.getenv('PDF_CACHE_MAX_MB', 256)) * 1024 * 1024)
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'writes': 0,
+            'evictions': 0,
+        }
+
+        self._enabled = True
+        try:
+            os.makedirs(self.files_dir, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    """CREATE TABLE IF NOT EXISTS pdf_text_cache (
+                        digest TEXT PRIMARY KEY,
+                        extractor TEXT NOT NULL,
+                        page_count INTEGER NOT NULL,
+                        pages BLOB NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )"""
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_pdf_text_cache_access ON pdf_text_cache(last_access)")
+        except (OSError, sqlite3.Error) as e:
+            print(f"Warning: PDF text cache disabled ({e}).")
+            self._enabled = False
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _file(self, digest: str) -> str:
+        return os.path.join(self.files_dir, f'{digest}.pdf')
+
+    def file_path(self, digest: str) -> Optional[str]:
+        """Path of the stored copy of a PDF, or None if it isn't kept"""
+        path = self._file(digest)
+        return path if self._enabled and os.path.exists(path) else None
+
+    def store_file(self, digest: str, path: str) -> None:
+        """Keep a copy of a PDF whose pages are not all extracted yet"""
+        if not self._enabled or os.path.exists(self._file(digest)):
+            return
+        temp_path = f'{self._file(digest)}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            shutil.copyfile(path, temp_path)
+            os.replace(temp_path, self._file(digest))
+        except OSError as e:
+            print(f"Warning: Could not store PDF for later extraction: {e}")
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def _remove_file(self, digest: str) -> None:
+        try:
+            os.unlink(self._file(digest))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Warning: Could not remove stored PDF: {e}")
+
+    def get(self, digest: str) -> Optional[List[Optional[str]]]:
+        """Return the cached page texts of a PDF (None for pages not extracted yet), or None on miss"""
+        if self._enabled:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT pages, page_count FROM pdf_text_cache WHERE digest = ? AND extractor = ?",
+                        (digest, EXTRACTOR_VERSION)
+                    ).fetchone()
+                    if row is not None:
+                        conn.execute("UPDATE pdf_text_cache SET last_access = ? WHERE digest = ?", (time.time(), digest))
+                        pages = json.loads(zlib.decompress(row[0]).decode('utf-8'))
+                        if len(pages) == row[1]:
+                            with self._lock:
+                                self._stats['hits'] += 1
+                            return pages
+            except (sqlite3.Error, zlib.error, ValueError) as e:
+                print(f"Warning: PDF text cache read failed: {e}")
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def set(self, digest: str, pages: List[Optional[str]]) -> None:
+        """
+        Store the page texts of a PDF.
+
+        Merges with the stored entry: pages another request has extracted in
+        the meantime are kept, so concurrent range requests don't overwrite
+        each other. The stored PDF is dropped once every page is known.
+        """
+        if not self._enabled:
+            return
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                # Take the write lock before reading, so that concurrent writers merge in turn
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    "SELECT pages FROM pdf_text_cache WHERE digest = ? AND extractor = ? AND page_count = ?",
+                    (digest, EXTRACTOR_VERSION, len(pages))
+                ).fetchone()
+                if row is not None:
+                    stored = json.loads(zlib.decompress(row[0]).decode('utf-8'))
+                    pages = [page if page is not None else stored_page for page, stored_page in zip(pages, stored)]
+
+                blob = zlib.compress(json.dumps(pages).encode('utf-8'))
+                size = len(blob)
+                complete = None not in pages
+                if not complete:
+                    file_path = self.file_path(digest)
+                    size += os.path.getsize(file_path) if file_path else 0
+                conn.execute(
+                    "INSERT OR REPLACE INTO pdf_text_cache "
+                    "(digest, extractor, page_count, pages, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (digest, EXTRACTOR_VERSION, len(pages), blob, size, now, now)
+                )
+                self._evict(conn)
+            if complete:
+                self._remove_file(digest)
+            with self._lock:
+                self._stats['writes'] += 1
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            print(f"Warning: PDF text cache write failed: {e}")
+
+    def _evict(self, conn) -> None:
+        """Drop least-recently-used entries until under the size cap"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pdf_text_cache").fetchone()[0]
+        evicted = 0
+        if total > self.max_disk_bytes:
+            rows = conn.execute("SELECT digest, size FROM pdf_text_cache ORDER BY last_access ASC").fetchall()
+            for digest, size in rows:
+                if total <= self.max_disk_bytes:
+                    break
+                conn.execute("DELETE FROM pdf_text_cache WHERE digest = ?", (digest,))
+                self._remove_file(digest)
+                total -= size
+                evicted += 1
+        with self._lock:
+            self._stats['evictions'] += evicted
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['enabled'] = self._enabled
+        if self._enabled:
+            try:
+                with self._connect() as conn:
+                    count, size = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pdf_text_cache"
+                    ).fetchone()
+                stats['disk_entries'] = count
+                stats['disk_bytes'] = size
+            except sqlite3.Error:
+                pass
+        return stats
+
+
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_pdf_text_cache() -> PDFTextCache:
+    """Return the process-wide PDF text cache"""
+    global _cache_instance
+    with _cache_lock:
+        if _cache_instance is None:
+            _cache_instance = PDFTextCache()
+        return _cache_instance
@@ -0,0 +1,84 @@
+import copy
+import threading
+from typing import Any, Callable, Dict
+
+
+class _Call:
+    """One in-flight computation and the threads waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers that arrive while
+    it is still running block until it finishes and receive the same result
+    (or the same exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {
+            'executions': 0,
+            'coalesced': 0,
+            'max_waiters': 0,
+        }
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats['coalesced'] += 1
+                self._stats['max_waiters'] = max(self._stats['max_waiters'], call.waiters)
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats['executions'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Each waiter gets its own copy so callers can't mutate each other's result
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return copy.deepcopy(call.result)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return totals plus the waiter count of every in-flight key"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = {key[:16]: call.waiters for key, call in self._calls.items()}
+        return stats
+
+
+_single_flight_instance = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide single-flight group for analyses"""
+    global _single_flight_instance
+    with _single_flight_lock:
+        if _single_flight_instance is None:
+            _single_flight_instance = SingleFlight()
+        return _single_flight_instance
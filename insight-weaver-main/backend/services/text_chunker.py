@@ -0,0 +1,80 @@
+import re
+from typing import List
+
+from services.token_estimator import CHARS_PER_TOKEN, estimate_tokens
+
+_PARAGRAPH_SPLIT = re.compile(r'\n\s*\n')
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """Split a paragraph that exceeds the budget into sentence-aligned pieces"""
+    pieces = []
+    for sentence in _SENTENCE_SPLIT.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        # A single run-on "sentence" (tables, OCR output) - fall back to word windows
+        words = sentence.split()
+        window = []
+        window_chars = 0
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        for word in words:
+            if window and window_chars + len(word) + 1 > max_chars:
+                pieces.append(' '.join(window))
+                window, window_chars = [], 0
+            window.append(word)
+            window_chars += len(word) + 1
+        if window:
+            pieces.append(' '.join(window))
+    return pieces
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks that each fit within max_tokens.
+    
+    Paragraph boundaries are preferred, then sentence boundaries, so that
+    every chunk stays readable on its own. Text that already fits is
+    returned as a single chunk.
+    
+    Args:
+        text: The text to split
+        max_tokens: Token budget per chunk
+        
+    Returns:
+        List of chunk strings in document order
+    """
+    text = (text or '').strip()
+    if not text or estimate_tokens(text) <= max_tokens:
+        return [text] if text else []
+    
+    units = []
+    for paragraph in _PARAGRAPH_SPLIT.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            units.append((paragraph, '\n\n'))
+        else:
+            units.extend((piece, ' ') for piece in _split_oversized(paragraph, max_tokens))
+    
+    chunks = []
+    current = []
+    current_tokens = 0
+    for unit, separator in units:
+        unit_tokens = estimate_tokens(unit) + 1
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append(''.join(current).strip())
+            current, current_tokens = [], 0
+        if current:
+            current.append(separator)
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append(''.join(current).strip())
+    
+    return chunks
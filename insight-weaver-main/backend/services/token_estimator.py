@@ -0,0 +1,107 @@
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+# Rough characters-per-token ratio for English prose with LLaMA-style tokenizers
+CHARS_PER_TOKEN = 4
+
+# Chat templates and role markers add a few tokens around every message
+PROMPT_OVERHEAD_TOKENS = 32
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap, slightly pessimistic token estimate.
+
+    ASCII text is counted at CHARS_PER_TOKEN characters per token; every
+    non-ASCII character (accents, CJK, emoji) is counted as a whole token,
+    since BPE vocabularies rarely merge them.
+    """
+    if not text:
+        return 0
+    non_ascii = len(text) - len(text.encode('ascii', 'ignore'))
+    return math.ceil((len(text) - non_ascii) / CHARS_PER_TOKEN) + non_ascii
+
+
+def _parse_buckets(value: str) -> List[int]:
+    buckets = []
+    for part in value.split(','):
+        part = part.strip()
+        if part:
+            try:
+                buckets.append(int(part))
+            except ValueError:
+                print(f"Warning: Ignoring invalid context bucket {part!r} in OLLAMA_CTX_BUCKETS")
+    return sorted(set(bucket for bucket in buckets if bucket > 0))
+
+
+class ContextSizer:
+    """
+    Picks num_ctx and num_predict for each generation from the prompt size.
+
+    Ollama reloads the model whenever num_ctx differs from the loaded
+    runner's, so by default every generation uses the same window,
+    OLLAMA_MAX_CTX (which the model keeper also loads), and only
+    num_predict follows the prompt size. With OLLAMA_CTX_BUCKETS set, the
+    smallest bucket that holds the prompt plus the expected output is used
+    instead, trading reloads on mixed traffic for a smaller KV-cache.
+    Models trained on a smaller window than OLLAMA_MAX_CTX get their own
+    window. Prompts that cannot fit are flagged as truncated.
+    """
+
+    def __init__(self, buckets: Optional[Sequence[int]] = None, max_ctx: Optional[int] = None,
+                 max_predict: Optional[int] = None):
+        self.max_ctx = max_ctx or int(os.getenv('OLLAMA_MAX_CTX', 4096))
+        self.max_predict = max_predict or int(os.getenv('OLLAMA_NUM_PREDICT', 2048))
+        self.min_predict = min(768, self.max_predict)
+        configured = list(buckets) if buckets else _parse_buckets(os.getenv('OLLAMA_CTX_BUCKETS', ''))
+        self.buckets = [bucket for bucket in configured if bucket < self.max_ctx] + [self.max_ctx]
+
+    def expected_output_tokens(self, content_tokens: int) -> int:
+        """Output budget for a learning map: a fixed base plus a share of the input size"""
+        return max(self.min_predict, min(self.max_predict, 768 + content_tokens // 4))
+
+    def max_content_tokens(self, system_prompt: str) -> int:
+        """Largest user prompt that still fits into max_ctx with a full output budget"""
+        return self.max_ctx - self.max_predict - estimate_tokens(system_prompt) - PROMPT_OVERHEAD_TOKENS
+
+    def plan(self, system_prompt: str, user_prompt: str, max_output_tokens: Optional[int] = None,
+             window: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Size one generation.
+
+        max_output_tokens caps the output budget for prompts that ask for only
+        part of a learning map. window is the model's trained context length
+        (from /api/show), when known; num_ctx never exceeds it.
+
+        Returns a dict with numCtx and numPredict (to pass as Ollama options),
+        the estimated promptTokens and whether the prompt will be truncated.
+        """
+        content_tokens = estimate_tokens(user_prompt)
+        prompt_tokens = content_tokens + estimate_tokens(system_prompt) + PROMPT_OVERHEAD_TOKENS
+        num_predict = self.expected_output_tokens(content_tokens)
+        if max_output_tokens:
+            num_predict = min(num_predict, max_output_tokens)
+
+        max_ctx = min(self.max_ctx, window) if window else self.max_ctx
+
+        # Give up some output budget before letting Ollama cut the prompt
+        if prompt_tokens + num_predict > max_ctx:
+            num_predict = max(min(self.min_predict, num_predict), max_ctx - prompt_tokens)
+
+        needed = prompt_tokens + num_predict
+        num_ctx = next((bucket for bucket in self.buckets if needed <= bucket <= max_ctx), max_ctx)
+
+        return {
+            'promptTokens': prompt_tokens,
+            'numCtx': num_ctx,
+            'numPredict': num_predict,
+            'truncated': needed > num_ctx,
+        }
+
+    def get_config(self) -> Dict[str, Any]:
+        return {
+            'buckets': self.buckets,
+            'maxCtx': self.max_ctx,
+            'maxPredict': self.max_predict,
+        }
@@ -0,0 +1,145 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from flask import Request
+
+MB = 1024 * 1024
+
+
+class UploadRejectedError(Exception):
+    """An upload that cannot be accepted right now (413 too large, 503 too many in flight)"""
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class UploadSpool:
+    """
+    Write-once buffer for an uploaded file.
+
+    Stays in memory up to memory_threshold bytes, then moves to a named
+    temporary file, so large uploads cost disk space instead of RSS and can
+    be memory-mapped or opened by path (e.g. by extraction workers). The
+    SHA-256 of the content is computed as it is written.
+    """
+
+    def __init__(self, memory_threshold: int, spool_dir: Optional[str] = None):
+        self.memory_threshold = memory_threshold
+        self.spool_dir = spool_dir
+        self._file = io.BytesIO()
+        self._on_disk = False
+        self._sha256 = hashlib.sha256()
+
+    @property
+    def digest(self) -> str:
+        """Hex SHA-256 of everything written so far"""
+        return self._sha256.hexdigest()
+
+    @property
+    def path(self) -> Optional[str]:
+        """Path of the spool file, or None while the upload is held in memory"""
+        return self._file.name if self._on_disk else None
+
+    def write(self, data: bytes) -> int:
+        if not self._on_disk and self._file.tell() + len(data) > self.memory_threshold:
+            self._rollover()
+        self._sha256.update(data)
+        return self._file.write(data)
+
+    def _rollover(self) -> None:
+        spooled = tempfile.NamedTemporaryFile(mode='w+b', suffix='.upload', dir=self.spool_dir)
+        spooled.write(self._file.getbuffer())
+        self._file = spooled
+        self._on_disk = True
+
+    def __getattr__(self, name: str) -> Any:
+        # read/readline/seek/tell/flush/close/closed go to the current buffer
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SpoolingRequest(Request):
+    """Flask request class that spools uploaded files through UploadSpool"""
+
+    memory_threshold = int(float(os.getenv('UPLOAD_MEMORY_THRESHOLD_KB', 512)) * 1024)
+    spool_dir = os.getenv('UPLOAD_SPOOL_DIR') or None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadSpool(self.memory_threshold, self.spool_dir)
+
+
+class UploadLimiter:
+    """
+    Caps the bytes of all uploads being received or processed at once.
+
+    A request reserves its Content-Length before its body is read; when the
+    reservation would exceed the limit the upload is rejected with 503
+    instead of queueing more data on disk and in memory.
+    """
+
+    def __init__(self, max_upload_bytes: Optional[int] = None, max_inflight_bytes: Optional[int] = None):
+        self.max_upload_bytes = max_upload_bytes or int(float(os.getenv('MAX_UPLOAD_MB', 100)) * MB)
+        self.max_inflight_bytes = max_inflight_bytes or int(float(os.getenv('UPLOAD_MAX_INFLIGHT_MB', 400)) * MB)
+        self._inflight = 0
+        self._lock = threading.Lock()
+        self._stats = {'accepted': 0, 'rejected_too_large': 0, 'rejected_busy': 0}
+
+    @contextmanager
+    def reserve(self, content_length: Optional[int]):
+        """Hold a share of the in-flight budget while an upload is handled"""
+        # Without a Content-Length the body can be as large as the per-request limit
+        size = self.max_upload_bytes if content_length is None else content_length
+        with self._lock:
+            if size > self.max_upload_bytes:
+                self._stats['rejected_too_large'] += 1
+                raise UploadRejectedError(
+                    f'Upload exceeds the {self.max_upload_bytes // MB} MB limit', 413
+                )
+            if self._inflight + size > self.max_inflight_bytes:
+                self._stats['rejected_busy'] += 1
+                raise UploadRejectedError(
+                    'Too many uploads are being processed. Please retry shortly.', 503, retry_after=5
+                )
+            self._inflight += size
+            self._stats['accepted'] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._inflight -= size
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['inflight_bytes'] = self._inflight
+        stats['max_upload_bytes'] = self.max_upload_bytes
+        stats['max_inflight_bytes'] = self.max_inflight_bytes
+        return stats
+
+
+_limiter_instance = None
+_limiter_lock = threading.Lock()
+
+
+def get_upload_limiter() -> UploadLimiter:
+    """Return the process-wide upload limiter"""
+    global _limiter_instance
+    with _limiter_lock:
+        if _limiter_instance is None:
+            _limiter_instance = UploadLimiter()
+        return _limiter_instance
@@ -0,0 +1,95 @@
+import pytest
+
+from services import circuit_breaker
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.llm_scheduler import LLMOverloadedError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(circuit_breaker, 'time', fake)
+    return fake
+
+
+def test_opens_after_threshold_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == 'closed'
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.retry_after == 30
+    assert isinstance(excinfo.value, LLMOverloadedError)
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+
+
+def test_half_open_lets_a_single_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.state == 'half_open'
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_successful_probe_closes_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_success()
+
+    assert breaker.state == 'closed'
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.retry_after == 30
+    assert breaker.get_stats()['opened'] == 2
+
+
+def test_released_probe_frees_the_probe_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    # The probe was shed before reaching Ollama: another call may probe
+    breaker.release()
+
+    breaker.before_call()
+    assert breaker.state == 'half_open'
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from services.json_repair import repair_json
+
+
+def loads(text):
+    return json.loads(repair_json(text))
+
+
+def test_valid_json_is_unchanged():
+    text = '{"summary": "ok", "keyTopics": ["a", "b"]}'
+    assert loads(text) == json.loads(text)
+
+
+def test_truncated_string_value_is_closed():
+    assert loads('{"summary": "The text was cut off') == {'summary': 'The text was cut off'}
+
+
+def test_truncated_nested_object_is_closed():
+    result = loads('{"summary": "S", "topicTree": [{"id": "1", "label": "Cells", "children": [{"id": "1-1"')
+    assert result['summary'] == 'S'
+    assert result['topicTree'][0]['label'] == 'Cells'
+    assert result['topicTree'][0]['children'] == [{'id': '1-1'}]
+
+
+def test_truncated_array_is_closed():
+    assert loads('{"keyTopics": ["Photosynthesis", "Respiration", "Chloro') == {
+        'keyTopics': ['Photosynthesis', 'Respiration', 'Chloro']
+    }
+    assert loads('[1, 2, [3, 4]') == [1, 2, [3, 4]]
+
+
+def test_number_at_the_cut_is_dropped():
+    # "4" may have been the start of "42"; only values completed before the cut are kept
+    assert loads('[1, 2, [3, 4') == [1, 2, [3]]
+
+
+def test_dangling_key_and_comma_are_dropped():
+    assert loads('{"summary": "S", "keyTopics":') == {'summary': 'S'}
+    assert loads('{"keyTopics": ["a", "b",') == {'keyTopics': ['a', 'b']}
+
+
+def test_trailing_commas_are_removed():
+    assert loads('{"keyTopics": ["a", "b",], "summary": "S",}') == {'keyTopics': ['a', 'b'], 'summary': 'S'}
+
+
+def test_python_literals_are_converted():
+    assert loads('{"partial": True, "error": None}') == {'partial': True, 'error': None}
+
+
+def test_raw_newlines_in_strings_are_escaped():
+    assert loads('{"summary": "line one\nline two"}') == {'summary': 'line one\nline two'}
+
+
+def test_unrepairable_text_still_fails():
+    with pytest.raises(ValueError):
+        loads('not json at all')
@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+from services.llm_scheduler import LLMOverloadedError, LLMScheduler
+
+
+def _acquire_in_thread(scheduler, background=False):
+    """Start acquire() in a thread; returns (thread, outcome dict)"""
+    outcome = {}
+
+    def run():
+        try:
+            if background:
+                with scheduler.request(background=True):
+                    outcome['waited'] = scheduler.acquire()
+            else:
+                outcome['waited'] = scheduler.acquire()
+        except LLMOverloadedError as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+def _wait_for_queue(scheduler, depth, timeout=2.0):
+    deadline = time.time() + timeout
+    while scheduler.get_stats()['queue_depth'] < depth:
+        assert time.time() < deadline, 'request was never queued'
+        time.sleep(0.005)
+
+
+def test_free_slot_is_granted_immediately():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=4, queue_timeout=1)
+    assert scheduler.acquire() == 0.0
+    assert scheduler.get_stats()['active'] == 1
+
+
+def test_full_queue_is_rejected_with_429():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=0, queue_timeout=60)
+    scheduler.acquire()
+
+    with pytest.raises(LLMOverloadedError) as excinfo:
+        scheduler.acquire()
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.retry_after >= 1
+    assert scheduler.get_stats()['rejected_queue_full'] == 1
+
+
+def test_expected_wait_beyond_deadline_is_rejected_with_503():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=8, queue_timeout=1)
+    scheduler.acquire()
+
+    # The default expected service time (30s) already exceeds the 1s deadline
+    with pytest.raises(LLMOverloadedError) as excinfo:
+        scheduler.acquire()
+    assert excinfo.value.status_code == 503
+    assert scheduler.get_stats()['rejected_deadline'] == 1
+    assert scheduler.get_stats()['queue_depth'] == 0
+
+
+def test_queued_request_times_out_at_its_deadline():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=8, queue_timeout=0.1)
+    scheduler._avg_service_time = 0.01
+    scheduler.acquire()
+
+    started = time.time()
+    with pytest.raises(LLMOverloadedError) as excinfo:
+        scheduler.acquire()
+    assert excinfo.value.status_code == 503
+    assert time.time() - started >= 0.1
+    assert scheduler.get_stats()['queue_depth'] == 0
+
+
+def test_release_hands_the_slot_to_the_oldest_waiter():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=8, queue_timeout=5)
+    scheduler._avg_service_time = 0.01
+    scheduler.acquire()
+    thread, outcome = _acquire_in_thread(scheduler)
+    _wait_for_queue(scheduler, 1)
+
+    scheduler.release()
+    thread.join(2)
+
+    assert 'waited' in outcome
+    stats = scheduler.get_stats()
+    assert stats['active'] == 1 and stats['queue_depth'] == 0
+
+
+def test_background_requests_wait_past_queue_limit_and_deadline():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=0, queue_timeout=0.05)
+    scheduler.acquire()
+    thread, outcome = _acquire_in_thread(scheduler, background=True)
+    _wait_for_queue(scheduler, 1)
+
+    time.sleep(0.1)
+    assert thread.is_alive()
+    scheduler.release()
+    thread.join(2)
+    assert 'waited' in outcome and 'error' not in outcome
+
+
+def test_admitted_request_is_not_rejected_for_further_generations():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=0, queue_timeout=0.05)
+    with scheduler.request():
+        scheduler.acquire()
+        # A second generation of the same analysis (e.g. the next chunk) queues
+        # behind the first instead of failing with 429
+        outcome = {}
+        releaser = threading.Timer(0.1, scheduler.release)
+        releaser.start()
+        outcome['waited'] = scheduler.acquire()
+        releaser.join()
+    assert outcome['waited'] >= 0.05
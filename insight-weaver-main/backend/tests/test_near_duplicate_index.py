@@ -0,0 +1,80 @@
+import pytest
+
+from services.near_duplicate_index import NearDuplicateIndex, estimate_similarity, minhash_signature
+
+SCOPE = 'model=llama2;prompt=1'
+
+
+def lecture(topic, sentences=40):
+    return ' '.join(
+        f'Sentence {i} of the lecture explains how {topic} relates to concept number {i * 7} in practice.'
+        for i in range(sentences)
+    )
+
+
+@pytest.fixture
+def index(tmp_path):
+    return NearDuplicateIndex(db_path=str(tmp_path / 'near_duplicates.sqlite3'), threshold=0.85, max_entries=100)
+
+
+def test_signature_is_deterministic_and_ignores_case():
+    text = lecture('photosynthesis')
+    assert minhash_signature(text) == minhash_signature(text.upper())
+
+
+def test_short_content_has_no_signature(index):
+    assert minhash_signature('Too short to compare.') is None
+    assert index.find(None, SCOPE) is None
+
+
+def test_near_duplicate_is_found(index):
+    original = lecture('photosynthesis')
+    index.add('key-original', SCOPE, minhash_signature(original))
+
+    reexported = 'Biology 101 - exported again\n\n' + original + ' Thanks for listening.'
+    match = index.find(minhash_signature(reexported), SCOPE)
+
+    assert match is not None
+    key, similarity = match
+    assert key == 'key-original'
+    assert 0.85 <= similarity <= 1.0
+    assert index.get_stats()['hits'] == 1
+
+
+def test_different_document_is_not_matched(index):
+    index.add('key-original', SCOPE, minhash_signature(lecture('photosynthesis')))
+    other = ' '.join(f'Paragraph {i} covers medieval trade routes and guild {i * 3}.' for i in range(60))
+
+    assert index.find(minhash_signature(other), SCOPE) is None
+    assert index.get_stats()['hits'] == 0
+
+
+def test_match_is_limited_to_its_scope(index):
+    text = lecture('photosynthesis')
+    index.add('key-original', SCOPE, minhash_signature(text))
+
+    assert index.find(minhash_signature(text), 'model=mistral;prompt=1') is None
+
+
+def test_removed_entry_is_not_matched(index):
+    text = lecture('photosynthesis')
+    index.add('key-original', SCOPE, minhash_signature(text))
+    index.remove('key-original')
+
+    assert index.find(minhash_signature(text), SCOPE) is None
+
+
+def test_index_is_reloaded_from_disk(tmp_path):
+    path = str(tmp_path / 'near_duplicates.sqlite3')
+    text = lecture('photosynthesis')
+    NearDuplicateIndex(db_path=path, threshold=0.85).add('key-original', SCOPE, minhash_signature(text))
+
+    reloaded = NearDuplicateIndex(db_path=path, threshold=0.85)
+    assert reloaded.find(minhash_signature(text), SCOPE)[0] == 'key-original'
+
+
+def test_similarity_estimate_tracks_overlap():
+    base = lecture('photosynthesis', sentences=80)
+    half = ' '.join(base.split()[:len(base.split()) // 2])
+    estimate = estimate_similarity(minhash_signature(base), minhash_signature(half))
+    assert 0.35 <= estimate <= 0.65
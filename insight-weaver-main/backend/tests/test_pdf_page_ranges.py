@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip('PyPDF2')
+
+from services.pdf_extract_service import parse_page_ranges
+
+
+@pytest.mark.parametrize('spec', [None, '', '   '])
+def test_empty_spec_selects_every_page(spec):
+    assert parse_page_ranges(spec, 4) == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize('spec, expected', [
+    ('1', [0]),
+    ('2-4', [1, 2, 3]),
+    ('1-2,5', [0, 1, 4]),
+    ('4-', [3, 4, 5]),
+    ('5, 1 ,3', [0, 2, 4]),
+    ('1-3,2-4', [0, 1, 2, 3]),
+    ('1,,2,', [0, 1]),
+])
+def test_ranges_are_one_based_inclusive_and_sorted(spec, expected):
+    assert parse_page_ranges(spec, 6) == expected
+
+
+def test_pages_past_the_end_are_ignored():
+    assert parse_page_ranges('5-100', 6) == [4, 5]
+    assert parse_page_ranges('2,9', 6) == [1]
+
+
+@pytest.mark.parametrize('spec', ['0', '0-3', '3-1', 'a', '1-b', '-3', '1-2-3'])
+def test_invalid_ranges_are_rejected(spec):
+    with pytest.raises(ValueError, match='Invalid page range'):
+        parse_page_ranges(spec, 6)
+
+
+@pytest.mark.parametrize('spec', ['7', '7-9', '10-', ','])
+def test_spec_selecting_no_page_is_rejected(spec):
+    with pytest.raises(ValueError, match='No pages in range'):
+        parse_page_ranges(spec, 6)
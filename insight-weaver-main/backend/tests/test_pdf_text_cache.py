@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from services.pdf_text_cache import PDFTextCache
+
+DIGEST = 'a' * 64
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PDFTextCache(db_path=str(tmp_path / 'pdf_text_cache.sqlite3'), max_disk_bytes=10 * 1024 * 1024)
+
+
+def test_unknown_document_is_a_miss(cache):
+    assert cache.get(DIGEST) is None
+    assert cache.get_stats()['misses'] == 1
+
+
+def test_later_writes_merge_with_stored_pages(cache):
+    cache.set(DIGEST, ['one', None, None])
+    cache.set(DIGEST, [None, 'two', None])
+
+    assert cache.get(DIGEST) == ['one', 'two', None]
+
+
+def test_stored_pages_are_not_overwritten_by_missing_ones(cache):
+    cache.set(DIGEST, ['one', 'two', 'three'])
+    cache.set(DIGEST, [None, None, None])
+
+    assert cache.get(DIGEST) == ['one', 'two', 'three']
+
+
+def test_entry_with_another_page_count_is_replaced(cache):
+    cache.set(DIGEST, ['one', None])
+    cache.set(DIGEST, [None, None, 'three'])
+
+    assert cache.get(DIGEST) == [None, None, 'three']
+
+
+def test_concurrent_page_sets_are_all_kept(cache):
+    page_count = 24
+    barrier = threading.Barrier(page_count)
+
+    def extract(page_num):
+        pages = [None] * page_count
+        pages[page_num] = f'page {page_num}'
+        barrier.wait()
+        cache.set(DIGEST, pages)
+
+    threads = [threading.Thread(target=extract, args=(page_num,)) for page_num in range(page_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert cache.get(DIGEST) == [f'page {page_num}' for page_num in range(page_count)]
+
+
+def test_stored_pdf_is_dropped_once_every_page_is_known(cache, tmp_path):
+    source = tmp_path / 'upload.pdf'
+    source.write_bytes(b'%PDF-1.4 not really a pdf')
+    cache.store_file(DIGEST, str(source))
+    cache.set(DIGEST, ['one', None])
+    assert cache.file_path(DIGEST) is not None
+
+    cache.set(DIGEST, [None, 'two'])
+    assert cache.file_path(DIGEST) is None
+    assert cache.get(DIGEST) == ['one', 'two']